@@ -0,0 +1,143 @@
+import asyncio
+import copy
+import functools
+import inspect
+import os
+
+from custom_jira import Jira
+
+class AsyncJira:
+    """asyncio flavour of `custom_jira.Jira`
+
+    Every public method of `Jira` is available here as a coroutine, and its generator methods (ie. `searchIssues`)
+    as async iterators. Calls are run on worker threads that share the same pooled session, and a semaphore caps
+    how many are in flight at once, so one event loop can serve many commands concurrently without a thread per
+    request.
+    """
+    __jira = None
+    __semaphore = None
+    __concurrency = 10
+    __reports = None
+
+    def __init__(self, host, user, token, prefix=False, concurrency=10, **kwargs):
+        """Creates an async Jira client
+
+            Args:
+                host: string - the Jira host (ie. 'my-jira-server.atlassian.net')
+                user: string - the email address of the Jira user
+                token: string - an API token for the Jira user
+                prefix: string - optional prefix for bot commands (defaults to False)
+                concurrency: integer - the most Jira calls we'll have in flight at once (defaults to 10)
+                kwargs: any other keyword arguments accepted by `Jira` (ie. `max_retries`)
+        """
+        kwargs.setdefault('pool_size', concurrency)
+        self.__jira = Jira(host, user, token, prefix, **kwargs)
+        self.__concurrency = concurrency
+        self.__reports = {}
+
+    @property
+    def jira(self):
+        """The underlying synchronous `Jira` client"""
+        return self.__jira
+
+    async def __call(self, method, *args, **kwargs):
+        # The semaphore is created lazily so that it binds to the loop that is actually running us
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.__concurrency)
+
+        async with self.__semaphore:
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+    def __getattr__(self, name):
+        method = getattr(self.__jira, name)
+        if name.startswith('_') or not callable(method):
+            return method
+
+        if inspect.isgeneratorfunction(method):
+            return self.__iterator(method)
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            return await self.__call(method, *args, **kwargs)
+
+        return wrapper
+
+    def __iterator(self, method):
+        """Wraps a generator method (ie. `iterateSprintsInBoard`) as an async iterator
+
+        Every step of the generator runs on a worker thread, so the paging it does never blocks the event loop.
+        """
+        finished = object()
+
+        @functools.wraps(method)
+        async def iterator(*args, **kwargs):
+            generator = method(*args, **kwargs)
+            try:
+                while True:
+                    item = await self.__call(next, generator, finished)
+                    if item is finished:
+                        return
+                    yield item
+            finally:
+                try:
+                    generator.close()
+                except ValueError:
+                    # Still running on a worker thread after we were cancelled, it'll be collected once it's done
+                    pass
+
+        return iterator
+
+    async def generateAllSprintReportData(self, sprint_id):
+        """Congomerates all the data from different Jira reports into one holistic Sprint Report data-set
+
+        Materialized reports are answered from the client's store. Otherwise only the sprint lookup is sequential;
+        the sprint report, board and velocity chart all hang off of the sprint's board and are fetched concurrently.
+        Concurrent calls for the same sprint share one build, each caller gets its own copy of the result.
+
+        Args:
+            sprint_id: string - the id of a Jira sprint
+
+        Returns:
+            dictionary - the information necessary for creating an AgileOps Sprint Report
+        """
+        key = str(sprint_id)
+        task = self.__reports.get(key)
+        if task is None:
+            task = self.__reports[key] = asyncio.ensure_future(self.__generateAllSprintReportData(sprint_id))
+            task.add_done_callback(lambda done: self.__reports.pop(key) if self.__reports.get(key) is done else None)
+
+        # Shielded so one caller giving up doesn't cancel the build for everyone else waiting on it
+        report = await asyncio.shield(task)
+
+        return copy.deepcopy(report)
+
+    async def __generateAllSprintReportData(self, sprint_id):
+        store = self.__jira.store
+        if store is not None:
+            materialized = await self.__call(store.getReportData, sprint_id)
+            if materialized:
+                return materialized[0]
+
+        sprint = await self.getSprint(sprint_id)
+        board_id = sprint['originBoardId']
+
+        sprint_report, board, average_velocity = await asyncio.gather(
+            self.getSprintReport(sprint_id, board_id),
+            self.getBoard(board_id),
+            self.getAverageVelocity(board_id, sprint_id)
+        )
+
+        # Parsing the report and calculating its metrics are CPU (and store) work, keep them off the event loop too
+        report = await self.getJiraSprintReportData(sprint_report)
+        report['issue_metrics'] = await self.getSprintMetrics(sprint_id, board_id, sprint_report)
+        report['project_name'] = board['location']['projectName']
+        report['project_key'] = board['location']['projectKey']
+        report['average_velocity'] = average_velocity
+
+        return report
+
+if __name__ == '__main__':
+    jira_host = os.environ["JIRA_HOST"]
+    jira_user = os.environ["JIRA_USER"]
+    jira_token = os.environ["JIRA_TOKEN"]
+    jira = AsyncJira(jira_host, jira_user, jira_token)
@@ -0,0 +1,186 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from custom_jira import Jira
+from rate_limiter import RateLimiter
+
+# Top level report fields copied as-is into CSV rows
+REPORT_COLUMNS = ["board_id", "sprint_id", "project_key", "project_name", "sprint_number", "sprint_start", "sprint_end", "average_velocity"]
+
+# Columns written in CSV mode, flattened from `generateAllSprintReportData`
+CSV_COLUMNS = REPORT_COLUMNS + \
+    [f"points_{name}" for name in ["committed", "completed", "planned_completed", "unplanned_completed", "feature_completed", "optimization_completed", "not_completed", "removed"]] + \
+    [f"items_{name}" for name in ["committed", "completed", "planned_completed", "unplanned_completed", "stories_completed", "unplanned_stories_completed", "bugs_completed", "unplanned_bugs_completed", "not_completed", "removed"]] + \
+    ["predictability", "predictability_of_commitments"]
+
+class BatchReportRunner:
+    """Builds sprint reports for every sprint across many projects or boards
+
+    Sprints are discovered from each board and their reports built on a bounded thread pool. Every worker goes
+    through the same `Jira` client, so a `RateLimiter` given to that client caps the whole run. Reports are written
+    out as NDJSON or CSV as soon as each one finishes, and finished sprints are appended to a checkpoint file so a
+    crashed run can pick up where it left off.
+    """
+
+    # How many reports may be queued or building per worker while sprints are still being discovered
+    __in_flight_per_worker = 2
+
+    def __init__(self, jira, workers=4, checkpoint=None):
+        """Creates a batch runner
+
+            Args:
+                jira: custom_jira.Jira - the client to use, ideally created with a `rate_limiter`
+                workers: integer - how many reports to build at once (defaults to 4)
+                checkpoint: string - file recording finished sprints, to resume from after a crash (defaults to None)
+        """
+        self.__jira = jira
+        self.__workers = workers
+        self.__checkpoint = checkpoint
+        self.__lock = threading.Lock()
+
+    def findSprints(self, projects=None, boards=None, states=('closed',)):
+        """Finds the sprints to report on
+
+            Args:
+                projects: list - project keys whose boards should be included (defaults to None)
+                boards: list - board ids to include (defaults to None)
+                states: tuple - sprint states to include (defaults to ('closed',))
+
+            Yields:
+                tuple - (board_id, sprint_id) for each sprint
+        """
+        board_ids = [str(board_id) for board_id in boards or []]
+        for project in projects or []:
+            results = self.__jira.getBoardsInProject(project)
+            if not results:
+                logging.error(f"Could not find any boards for project {project}")
+                continue
+            board_ids.extend(str(board['id']) for board in results['values'] if str(board['id']) not in board_ids)
+
+        for board_id in board_ids:
+            for sprint in self.__jira.iterateSprintsInBoard(board_id):
+                # Sprints can show up on several boards, only report them on the board they came from
+                if sprint.get('state') in states and str(sprint.get('originBoardId', board_id)) == board_id:
+                    yield board_id, str(sprint['id'])
+
+    def __finished(self):
+        if not self.__checkpoint or not os.path.exists(self.__checkpoint):
+            return set()
+
+        with open(self.__checkpoint) as checkpoint:
+            return {line.strip() for line in checkpoint if line.strip()}
+
+    def __report(self, board_id, sprint_id):
+        report = self.__jira.generateAllSprintReportData(sprint_id)
+        report['board_id'] = board_id
+        report['sprint_id'] = sprint_id
+        return report
+
+    @staticmethod
+    def toRow(report):
+        """Flattens a report into a CSV row
+
+            Args:
+                report: dictionary - a report from `generateAllSprintReportData`, plus `board_id` and `sprint_id`
+
+            Returns:
+                dictionary - values keyed by `CSV_COLUMNS`
+        """
+        row = {column: report.get(column) for column in REPORT_COLUMNS}
+        metrics = report['issue_metrics']
+        for kind in ["points", "items"]:
+            for name, value in metrics[kind].items():
+                row[f"{kind}_{name}"] = value
+        row.update(metrics['meta'])
+        return row
+
+    def __write(self, future, sprint_id, out, writer, counts):
+        """Writes out a finished report and checkpoints its sprint"""
+        try:
+            report = future.result()
+        except Exception as e:
+            logging.error(f"Could not build a report for sprint {sprint_id}: {e}")
+            counts["failed"] += 1
+            return
+
+        with self.__lock:
+            if writer is not None:
+                writer.writerow(self.toRow(report))
+            else:
+                out.write(json.dumps(report) + "\n")
+            out.flush()
+
+            if self.__checkpoint:
+                with open(self.__checkpoint, 'a') as checkpoint:
+                    checkpoint.write(f"{sprint_id}\n")
+
+        counts["reported"] += 1
+
+    def run(self, output, projects=None, boards=None, states=('closed',), format='ndjson'):
+        """Builds reports for every matching sprint, writing each one out as soon as it's done
+
+            Args:
+                output: string - file to write reports to, appended to when resuming from a checkpoint
+                projects: list - project keys whose boards should be included (defaults to None)
+                boards: list - board ids to include (defaults to None)
+                states: tuple - sprint states to include (defaults to ('closed',))
+                format: string - 'ndjson' or 'csv' (defaults to 'ndjson')
+
+            Returns:
+                dictionary - how many sprints were reported, skipped (already checkpointed) and failed
+        """
+        finished = self.__finished()
+        counts = {"reported": 0, "skipped": 0, "failed": 0}
+        resuming = bool(finished) and os.path.exists(output)
+
+        with open(output, 'a' if resuming else 'w', newline='') as out, ThreadPoolExecutor(max_workers=self.__workers) as pool:
+            writer = None
+            if format == 'csv':
+                writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+                if not resuming:
+                    writer.writeheader()
+
+            # Reports are submitted while sprints are still being discovered, with only a few in flight per worker,
+            # so output starts straight away and a large organization doesn't queue up every sprint at once
+            futures = {}
+            limit = self.__workers * self.__in_flight_per_worker
+            for board_id, sprint_id in self.findSprints(projects, boards, states):
+                if sprint_id in finished:
+                    counts["skipped"] += 1
+                    continue
+
+                if len(futures) >= limit:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.__write(future, futures.pop(future), out, writer, counts)
+
+                futures[pool.submit(self.__report, board_id, sprint_id)] = sprint_id
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.__write(future, futures.pop(future), out, writer, counts)
+
+        return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds sprint reports for every sprint in some projects or boards')
+    parser.add_argument('--projects', nargs='*', default=[], help='project keys')
+    parser.add_argument('--boards', nargs='*', default=[], help='board ids')
+    parser.add_argument('--states', nargs='*', default=['closed'], help='sprint states to report on')
+    parser.add_argument('--output', required=True, help='NDJSON or CSV file to write reports to')
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=10, help='requests per second shared by every worker')
+    parser.add_argument('--burst', type=int, default=None, help='requests allowed back to back (defaults to --rate)')
+    parser.add_argument('--checkpoint', help='file recording finished sprints so a crashed run can resume')
+    args = parser.parse_args()
+
+    jira = Jira(os.environ["JIRA_HOST"], os.environ["JIRA_USER"], os.environ["JIRA_TOKEN"], pool_size=args.workers, rate_limiter=RateLimiter(args.rate, args.burst))
+    runner = BatchReportRunner(jira, args.workers, args.checkpoint)
+    print(runner.run(args.output, args.projects, args.boards, tuple(args.states), args.format))
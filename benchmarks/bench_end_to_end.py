@@ -0,0 +1,70 @@
+import argparse
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from custom_jira import Jira
+from benchmarks.fake_jira import FakeJira
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted list of samples"""
+    if not samples:
+        return 0.0
+
+    return samples[min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))]
+
+def runOperation(name, operation, calls, concurrency):
+    """Calls `operation(index)` `calls` times across `concurrency` threads and prints throughput and latency percentiles"""
+    latencies = []
+
+    def timed(index):
+        start = time.perf_counter()
+        operation(index)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(calls)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{name:<28} {calls / elapsed:>9.1f}/s {percentile(latencies, 0.5) * 1000:>9.1f}ms {percentile(latencies, 0.9) * 1000:>9.1f}ms {percentile(latencies, 0.99) * 1000:>9.1f}ms {latencies[-1] * 1000:>9.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end benchmark of the Jira client against a local fake Jira')
+    parser.add_argument('--calls', type=int, default=50, help='calls per operation')
+    parser.add_argument('--concurrency', type=int, default=4, help='threads making calls at once')
+    parser.add_argument('--boards', type=int, default=5)
+    parser.add_argument('--sprints', type=int, default=40, help='sprints per board')
+    parser.add_argument('--issues', type=int, default=200, help='issues per sprint report')
+    parser.add_argument('--filters', type=int, default=1000)
+    parser.add_argument('--issues-searched', type=int, default=2000, help='issues returned by search')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds of simulated network latency per request')
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered with a 429')
+    parser.add_argument('--retry-after', type=float, default=0.05)
+    parser.add_argument('--replay', help='NDJSON recording to serve before falling back to synthetic data')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    fake = FakeJira(args.boards, args.sprints, args.issues, args.filters, args.page_size, args.latency, args.jitter,
+                    args.throttle_rate, args.retry_after, replay=args.replay, issues=args.issues_searched)
+
+    with fake:
+        address = fake.start()
+        jira = Jira(address, 'benchmark', 'benchmark', pool_size=args.concurrency, backoff_factor=0.05, scheme='http')
+        rng = random.Random(0)
+        sprint_ids = [sprint_id for board_id in range(1, args.boards + 1) for sprint_id in fake.sprintIds(board_id)]
+
+        print(f"{'operation':<28} {'throughput':>11} {'p50':>11} {'p90':>11} {'p99':>11} {'max':>11}")
+        runOperation('generateAllSprintReportData', lambda _: jira.generateAllSprintReportData(rng.choice(sprint_ids)), args.calls, args.concurrency)
+        runOperation('getSprintsInBoard', lambda index: jira.getSprintsInBoard(index % args.boards + 1), args.calls, args.concurrency)
+        runOperation('getFiltersWithJQL', lambda _: jira.getFiltersWithJQL(), args.calls, args.concurrency)
+        runOperation('searchIssues', lambda _: sum(1 for _ in jira.searchIssues('project = SYN')), args.calls, args.concurrency)
+
+        print(f"\nServer: {fake.stats}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+import argparse
+import logging
+import time
+
+from custom_jira import Jira
+from benchmarks.synthetic import generateSprintReport
+
+def referenceCalculateSprintMetrics(sprint_report):
+    """The original, loop-per-category `Jira.calculateSprintMetrics`, kept as the baseline to benchmark against
+
+    Args:
+        sprint_report: dictionary - the data from a Jira sprint reports
+
+    Returns:
+        dictionary - calculated metrics
+    """
+    points = {
+        "committed": 0,
+        "completed": 0,
+        "planned_completed": 0,
+        "unplanned_completed": 0,
+        "feature_completed": 0,
+        "optimization_completed": 0,
+        "not_completed": 0,
+        "removed": 0
+    }
+
+    items = {
+        "committed": 0,
+        "completed": 0,
+        "planned_completed": 0,
+        "unplanned_completed": 0,
+        "stories_completed": 0,
+        "unplanned_stories_completed": 0,
+        "bugs_completed": 0,
+        "unplanned_bugs_completed": 0,
+        "not_completed": 0,
+        "removed": 0
+    }
+
+    issue_keys = {
+        "committed": [],
+        "completed": [],
+        "incomplete": [],
+        "removed": []
+    }
+
+    feature_work = ["Story", "Design", "Spike"]
+    optimization = ["Optimization"]
+    bug = ["Bug"]
+    ignore = ["Task", "Epic"]
+
+    # Completed Work
+    for completed in sprint_report["contents"]["completedIssues"]:
+        issue_keys["completed"].append(completed["key"])
+
+        # Short-circuit for things we don't track
+        if completed["typeName"] in ignore:
+            continue
+
+        try:
+            issue_points_original = int(completed["estimateStatistic"]["statFieldValue"]["value"])
+        except:
+            issue_points_original = 0
+
+        try:
+            issue_points = int(completed["currentEstimateStatistic"]["statFieldValue"]["value"])
+        except:
+            issue_points = 0
+
+        points["completed"] += issue_points
+        items["completed"] += 1
+
+        unplanned = False
+        if completed["key"] in sprint_report["contents"]["issueKeysAddedDuringSprint"].keys():
+            unplanned = True
+            points["unplanned_completed"] += issue_points
+            items["unplanned_completed"] += 1
+        else:
+            issue_keys["committed"].append(completed["key"])
+            points["committed"] += issue_points_original
+            items["committed"] += 1
+            points["planned_completed"] += issue_points
+            items["planned_completed"] += 1
+            if issue_points_original < issue_points:
+                points["unplanned_completed"] += issue_points-issue_points_original
+
+        # Story
+        if completed["typeName"] == "Story":
+            items["stories_completed"] += 1
+            if unplanned:
+                items["unplanned_stories_completed"] += 1
+
+        # Story / Design / Spike (Feature Work)
+        if completed["typeName"] in feature_work:
+            points["feature_completed"] += issue_points
+
+        # Optimization
+        if completed["typeName"] in optimization:
+            points["optimization_completed"] += issue_points
+
+        # Bugs
+        if completed["typeName"] in bug:
+            items["bugs_completed"] += 1
+            if unplanned:
+                items["unplanned_bugs_completed"] += 1
+
+
+    # Incomplete Work
+    for incomplete in sprint_report["contents"]["issuesNotCompletedInCurrentSprint"]:
+
+        issue_keys["incomplete"].append(incomplete["key"])
+
+        # Short-circuit for things we don't track
+        if incomplete["typeName"] in ignore:
+            continue
+
+        try:
+            issue_points = int(incomplete["currentEstimateStatistic"]["statFieldValue"]["value"])
+        except:
+            issue_points = 0
+
+        points["not_completed"] += issue_points
+        items["not_completed"] += 1
+
+        if incomplete["key"] not in sprint_report["contents"]["issueKeysAddedDuringSprint"].keys():
+            issue_keys["committed"].append(incomplete["key"])
+            points["committed"] += issue_points
+            items["committed"] += 1
+
+    # Removed Work
+    for removed in sprint_report["contents"]["puntedIssues"]:
+
+        issue_keys["removed"].append(removed["key"])
+
+        # Short-circuit for things we don't track
+        if removed["typeName"] in ignore:
+            continue
+
+        try:
+            issue_points = int(removed["currentEstimateStatistic"]["statFieldValue"]["value"])
+        except:
+            issue_points = 0
+
+        if removed["key"] not in sprint_report["contents"]["issueKeysAddedDuringSprint"].keys():
+            points["committed"] += issue_points
+            items["committed"] += 1
+            issue_keys["committed"].append(removed["key"])
+
+        points["removed"] += issue_points
+        items["removed"] += 1
+
+    meta = {
+        "predictability": 0,
+        "predictability_of_commitments": 0
+    }
+
+    if points['committed'] != 0:
+        meta['predictability'] = int(points['completed']/points['committed']*100)
+        meta['predictability_of_commitments'] = int(points['planned_completed']/points['committed']*100)
+    else:
+        # If a sprint has no points committed, we say the predictability is 0
+        logging.warning('This sprint had no commitments, predictability is 0')
+
+    return {
+        "points" : points,
+        "items" : items,
+        "issue_keys": issue_keys,
+        "meta": meta
+    }
+
+def timeIt(function, argument, repeat):
+    """Runs `function(argument)` `repeat` times and returns the best wall-clock time in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks sprint metrics calculation on synthetic sprint reports')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 25000, 50000, 100000], help='issue counts per sprint report')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per size, the best time is reported')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    jira = Jira('example.atlassian.net', 'benchmark', 'benchmark')
+
+    print(f"{'issues':>8} {'reference':>12} {'optimized':>12} {'speedup':>8} {'issues/s':>12}")
+    for size in args.sizes:
+        sprint_report = generateSprintReport(size)
+        if jira.calculateSprintMetrics(sprint_report) != referenceCalculateSprintMetrics(sprint_report):
+            raise SystemExit(f"Optimized metrics differ from the reference implementation for {size} issues")
+
+        reference = timeIt(referenceCalculateSprintMetrics, sprint_report, args.repeat)
+        optimized = timeIt(jira.calculateSprintMetrics, sprint_report, args.repeat)
+        print(f"{size:>8} {reference * 1000:>10.1f}ms {optimized * 1000:>10.1f}ms {reference / optimized:>7.2f}x {size / optimized:>12,.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generateSprintReport
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def timeCommand(command, runs, env=None):
+    """Runs a command `runs` times in fresh interpreters
+
+        Returns:
+            list - wall clock seconds of each run, sorted
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+
+    return sorted(samples)
+
+def buildStore(path, sprint_id=1):
+    """Fills a sprint store with one closed sprint so the CLI can answer without a Jira"""
+    from custom_jira import Jira
+    from sprint_store import SprintReportStore
+
+    store = SprintReportStore(path)
+    report = generateSprintReport(200, sprint_id)
+    store.saveSprint({'id': sprint_id, 'originBoardId': 1, 'state': 'closed'})
+    store.saveReport(1, sprint_id, report)
+    store.saveMetrics(1, sprint_id, Jira('localhost', 'benchmark', 'benchmark').calculateSprintMetrics(report))
+    store.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Start-up time of the Jira client and CLI in fresh interpreters')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget', type=float, help='fail if the median of any case is over this many milliseconds')
+    args = parser.parse_args()
+
+    python = sys.executable
+    env = dict(os.environ, JIRA_HOST='localhost:9', JIRA_USER='benchmark', JIRA_TOKEN='benchmark')
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = os.path.join(directory, 'sprints.db')
+        buildStore(store)
+
+        cases = [
+            ('python (baseline)', [python, '-c', 'pass']),
+            ('import custom_jira', [python, '-c', 'import custom_jira']),
+            ('import requests', [python, '-c', 'import requests']),
+            ('jira_cli.py --help', [python, 'jira_cli.py', '--help']),
+            ('jira_cli.py metrics (stored)', [python, 'jira_cli.py', '--store', store, 'metrics', '1']),
+        ]
+
+        print(f"{'case':<30} {'min':>9} {'median':>9} {'max':>9}")
+        over_budget = False
+        for name, command in cases:
+            samples = timeCommand(command, args.runs, env)
+            median = statistics.median(samples) * 1000
+            print(f"{name:<30} {samples[0] * 1000:>7.1f}ms {median:>7.1f}ms {samples[-1] * 1000:>7.1f}ms")
+            if args.budget is not None and name != 'import requests' and median > args.budget:
+                over_budget = True
+
+        # Anything answered from the store shouldn't need an HTTP stack at all
+        check = subprocess.run(
+            [python, '-c', f"import sys, jira_cli; jira_cli.run(jira_cli.parseArgs(['--store', {store!r}, 'metrics', '1'])); print('requests' in sys.modules)"],
+            cwd=ROOT, env=env, check=True, capture_output=True, text=True
+        )
+        print(f"\nrequests imported for a stored sprint: {check.stdout.strip()}")
+
+    if over_budget:
+        print(f"Over the {args.budget}ms budget")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
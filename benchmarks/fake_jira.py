@@ -0,0 +1,396 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from benchmarks.synthetic import generateSprintReport
+
+FILTER_JQL_TEMPLATES = [
+    "project = {project} AND sprint in openSprints()",
+    "project = {project} AND issuetype = Bug AND status != Done ORDER BY priority DESC",
+    "project in ({project}, {other}) AND cf[10002] is not EMPTY",
+    "assignee = currentUser() AND resolution = Unresolved",
+    "project = {project} AND \"Story Points\" > 5 AND sprint in closedSprints()",
+    "labels = tech-debt AND project = {project}",
+    "filter = {filter_id} AND updated >= -14d",
+    "project = {project} AND fixVersion in unreleasedVersions() AND customfield_{field} = yes"
+]
+
+class FakeJira:
+    """Local stand-in for the Jira endpoints `custom_jira.Jira` talks to
+
+    Serves the agile `sprint` / `board` endpoints, the greenhopper `sprintreport` / `velocity` charts,
+    `filter/search` and issue `search` from deterministic synthetic data, with configurable latency, page sizes and 429 throttling.
+
+    Traffic can also be recorded to, and replayed from, an NDJSON file with one
+    `{"method", "path", "query", "status", "body"}` object per line. With an `upstream` set, requests that aren't in
+    the replay file are forwarded to a real Jira (using the caller's credentials) so a session can be captured once and
+    replayed in benchmarks afterwards.
+    """
+
+    def __init__(self, boards=5, sprints_per_board=40, issues_per_sprint=200, filters=500, page_size=50,
+                 latency=0.0, jitter=0.0, throttle_rate=0.0, retry_after=1, seed=0, replay=None, record=None, upstream=None, issues=2000):
+        """Creates a fake Jira
+
+            Args:
+                boards: integer - how many boards (each in its own project) to generate (defaults to 5)
+                sprints_per_board: integer - how many sprints each board has, the newest is active (defaults to 40)
+                issues_per_sprint: integer - how many issues each sprint report has (defaults to 200)
+                filters: integer - how many filters `filter/search` returns (defaults to 500)
+                page_size: integer - `maxResults` for paginated endpoints (defaults to 50)
+                latency: float - seconds added to every response (defaults to 0.0)
+                jitter: float - up to this many extra random seconds added to every response (defaults to 0.0)
+                throttle_rate: float - fraction of requests answered with a 429 (defaults to 0.0)
+                retry_after: float - `Retry-After` seconds sent with throttled responses (defaults to 1)
+                seed: integer - seed for all generated data (defaults to 0)
+                replay: string - NDJSON file of recorded responses to serve first (defaults to None)
+                record: string - NDJSON file to append every served response to (defaults to None)
+                upstream: string - base URL of a real Jira to forward unknown requests to (defaults to None)
+                issues: integer - how many issues `search` returns, whatever the JQL (defaults to 2000)
+        """
+        self.boards = boards
+        self.sprints_per_board = sprints_per_board
+        self.issues_per_sprint = issues_per_sprint
+        self.filters = filters
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.seed = seed
+        self.upstream = upstream.rstrip('/') if upstream else None
+        self.issues = issues
+
+        self.__rng = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__reports = {}
+        self.__recordings = {}
+        self.__record_file = open(record, 'a') if record else None
+        self.__server = None
+        self.__thread = None
+        self.stats = {"requests": 0, "throttled": 0, "replayed": 0, "forwarded": 0, "not_found": 0}
+
+        if replay:
+            with open(replay) as recording:
+                for line in recording:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.__recordings[(entry["method"], entry["path"], entry["query"])] = (entry["status"], entry["body"])
+
+        self.__routes = [
+            (re.compile(r'/rest/agile/latest/sprint/(\d+)$'), self.sprint),
+            (re.compile(r'/rest/agile/latest/board/(\d+)$'), self.board),
+            (re.compile(r'/rest/agile/latest/board/(\d+)/sprint$'), self.sprintsInBoard),
+            (re.compile(r'/rest/agile/latest/board$'), self.boardsInProject),
+            (re.compile(r'/rest/greenhopper/latest/rapid/charts/sprintreport$'), self.sprintReport),
+            (re.compile(r'/rest/greenhopper/latest/rapid/charts/velocity$'), self.velocity),
+            (re.compile(r'/rest/api/latest/filter/search$'), self.filterSearch),
+            (re.compile(r'/rest/api/latest/search$'), self.search),
+            (re.compile(r'/rest/api/latest/myself$'), self.myself)
+        ]
+
+    # Generated data
+
+    def sprintIds(self, board_id):
+        return [board_id * 1000 + number for number in range(1, self.sprints_per_board + 1)]
+
+    def __sprintObject(self, sprint_id):
+        board_id, number = divmod(sprint_id, 1000)
+        if not (1 <= board_id <= self.boards and 1 <= number <= self.sprints_per_board):
+            return None
+
+        return {
+            "id": sprint_id,
+            "self": f"/rest/agile/1.0/sprint/{sprint_id}",
+            "state": "active" if number == self.sprints_per_board else "closed",
+            "name": f"P{board_id} Sprint {number}",
+            "startDate": "2021-03-01T09:00:00.000Z",
+            "endDate": "2021-03-15T09:00:00.000Z",
+            "originBoardId": board_id,
+            "goal": f"Ship sprint {number}\nKeep the lights on"
+        }
+
+    def __page(self, values, query, include_total):
+        start_at = int(query.get('startAt', 0))
+        max_results = min(int(query.get('maxResults', self.page_size)), self.page_size)
+        page = {
+            "maxResults": max_results,
+            "startAt": start_at,
+            "isLast": start_at + max_results >= len(values),
+            "values": values[start_at:start_at + max_results]
+        }
+        if include_total:
+            page["total"] = len(values)
+
+        return page
+
+    def sprint(self, query, sprint_id):
+        return self.__sprintObject(int(sprint_id))
+
+    def board(self, query, board_id):
+        board_id = int(board_id)
+        if not 1 <= board_id <= self.boards:
+            return None
+
+        return {
+            "id": board_id,
+            "self": f"/rest/agile/1.0/board/{board_id}",
+            "name": f"P{board_id} board",
+            "type": "scrum",
+            "location": {
+                "projectId": 10000 + board_id,
+                "projectKey": f"P{board_id}",
+                "projectName": f"Project {board_id}",
+                "projectTypeKey": "software"
+            }
+        }
+
+    def boardsInProject(self, query):
+        if 'projectKeyOrId' not in query:
+            return self.__page([self.board(query, board_id) for board_id in range(1, self.boards + 1)], query, True)
+
+        match = re.match(r'P(\d+)$', query['projectKeyOrId'])
+        boards = [self.board(query, match.group(1))] if match and self.board(query, match.group(1)) else []
+        return self.__page(boards, query, True)
+
+    def sprintsInBoard(self, query, board_id):
+        board_id = int(board_id)
+        if not 1 <= board_id <= self.boards:
+            return None
+
+        # Like the real agile API, sprints come oldest first and there's no total
+        sprints = [self.__sprintObject(sprint_id) for sprint_id in self.sprintIds(board_id)]
+        if query.get('state'):
+            states = query['state'].split(',')
+            sprints = [sprint for sprint in sprints if sprint['state'] in states]
+        return self.__page(sprints, query, False)
+
+    def sprintReport(self, query):
+        sprint = self.__sprintObject(int(query.get('sprintId', 0)))
+        if sprint is None or str(sprint["originBoardId"]) != query.get('rapidViewId'):
+            return None
+
+        with self.__lock:
+            if sprint["id"] not in self.__reports:
+                report = generateSprintReport(self.issues_per_sprint, sprint["id"], f"P{sprint['originBoardId']}", self.seed, sprint["state"].upper())
+                report["sprint"]["name"] = sprint["name"]
+                self.__reports[sprint["id"]] = json.dumps(report)
+
+            return json.loads(self.__reports[sprint["id"]])
+
+    def velocity(self, query):
+        board_id = int(query.get('rapidViewId', 0))
+        if not 1 <= board_id <= self.boards:
+            return None
+
+        rng = random.Random(f"{self.seed}-velocity-{board_id}")
+        closed = self.sprintIds(board_id)[:-1]
+        entries = {}
+        for sprint_id in closed:
+            estimated = rng.randint(20, 60)
+            entries[str(sprint_id)] = {
+                "estimated": {"value": float(estimated), "text": str(estimated)},
+                "completed": {"value": float(max(0, estimated + rng.randint(-15, 10))), "text": ""}
+            }
+
+        return {
+            "sprints": [{"id": sprint_id, "name": f"P{board_id} Sprint {sprint_id % 1000}", "state": "CLOSED"} for sprint_id in closed],
+            "velocityStatEntries": entries
+        }
+
+    def filterSearch(self, query):
+        filters = []
+        rng = random.Random(f"{self.seed}-filters")
+        for filter_id in range(10000, 10000 + self.filters):
+            project, other = rng.sample(range(1, max(self.boards, 2) + 1), 2)
+            jql = rng.choice(FILTER_JQL_TEMPLATES).format(project=f"P{project}", other=f"P{other}", filter_id=rng.randint(10000, 10000 + self.filters), field=rng.randint(10000, 10100))
+            found = {"id": str(filter_id), "name": f"Filter {filter_id}", "self": f"/rest/api/latest/filter/{filter_id}"}
+            if 'jql' in query.get('expand', ''):
+                found["jql"] = jql
+            filters.append(found)
+
+        return self.__page(filters, query, True)
+
+    def search(self, query):
+        start_at = int(query.get('startAt', 0))
+        max_results = min(int(query.get('maxResults', self.page_size)), 100)
+        requested = query.get('fields', '*navigable')
+
+        issues = []
+        for index in range(start_at, min(start_at + max_results, self.issues)):
+            rng = random.Random(f"{self.seed}-issue-{index}")
+            fields = {
+                "summary": f"Synthetic issue {index}",
+                "status": {"name": rng.choice(["To Do", "In Progress", "Done"]), "statusCategory": {"key": rng.choice(["new", "indeterminate", "done"])}},
+                "issuetype": {"name": rng.choice(["Story", "Bug", "Task"]), "subtask": False, "iconUrl": "https://example.com/icon.png"},
+                "assignee": {"displayName": f"User {rng.randint(1, 25)}", "accountId": f"user{rng.randint(1, 25)}", "avatarUrls": {"48x48": "https://example.com/avatar.png"}},
+                "description": "Lorem ipsum dolor sit amet. " * rng.randint(5, 40),
+                "customfield_10002": float(rng.choice([1, 2, 3, 5, 8])),
+                "created": "2021-03-01T10:15:30.000+0000",
+                "updated": "2021-03-02T10:15:30.000+0000"
+            }
+            if requested != '*navigable':
+                wanted = set(requested.split(','))
+                fields = {name: value for name, value in fields.items() if name in wanted}
+            issues.append({"id": str(100000 + index), "key": f"SYN-{index}", "self": f"/rest/api/latest/issue/{100000 + index}", "fields": fields})
+
+        return {"startAt": start_at, "maxResults": max_results, "total": self.issues, "issues": issues}
+
+    def myself(self, query):
+        return {"accountId": "fake", "emailAddress": "fake@example.com", "displayName": "Fake User"}
+
+    # Request handling
+
+    def handle(self, method, target, headers):
+        """Works out the response to a request
+
+            Args:
+                method: string - HTTP verb
+                target: string - request path including the query string
+                headers: dictionary - request headers (used to forward credentials upstream)
+
+            Returns:
+                tuple - (status, extra response headers, body bytes)
+        """
+        parts = urlsplit(target)
+        path = re.sub(r'/+', '/', parts.path)
+        query_pairs = sorted(parse_qsl(parts.query))
+        query_string = urlencode(query_pairs)
+
+        delay = self.latency + (self.__rng.random() * self.jitter if self.jitter else 0)
+        with self.__lock:
+            self.stats["requests"] += 1
+            throttled = self.throttle_rate and self.__rng.random() < self.throttle_rate
+            if throttled:
+                self.stats["throttled"] += 1
+
+        if delay:
+            time.sleep(delay)
+
+        if throttled:
+            return 429, {"Retry-After": str(self.retry_after)}, b'{"errorMessages": ["Rate limit exceeded"]}'
+
+        key = (method, path, query_string)
+        if key in self.__recordings:
+            status, body = self.__recordings[key]
+            with self.__lock:
+                self.stats["replayed"] += 1
+        elif self.upstream:
+            status, body = self.__forward(method, path, query_string, headers)
+        else:
+            body = None
+            for pattern, handler in self.__routes:
+                match = pattern.search(path)
+                if match:
+                    body = handler(dict(query_pairs), *match.groups())
+                    break
+            status = 200 if body is not None else 404
+            if body is None:
+                body = {"errorMessages": [f"Nothing at {method} {target}"]}
+                with self.__lock:
+                    self.stats["not_found"] += 1
+
+        if self.__record_file:
+            with self.__lock:
+                self.__record_file.write(json.dumps({"method": method, "path": path, "query": query_string, "status": status, "body": body}) + "\n")
+                self.__record_file.flush()
+
+        return status, {}, json.dumps(body).encode()
+
+    def __forward(self, method, path, query_string, headers):
+        import requests
+
+        response = requests.request(method, f"{self.upstream}{path}", params=query_string or None,
+                                    headers={name: value for name, value in headers.items() if name.lower() in ('authorization', 'accept')})
+        with self.__lock:
+            self.stats["forwarded"] += 1
+
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, {"errorMessages": [response.text]}
+
+    def start(self, host='127.0.0.1', port=0):
+        """Starts serving on a background thread
+
+            Args:
+                host: string - interface to listen on (defaults to '127.0.0.1')
+                port: integer - port to listen on, 0 picks a free one (defaults to 0)
+
+            Returns:
+                string - the `host:port` to hand to `Jira(..., scheme='http')`
+        """
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so clients can keep connections alive
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, headers, body = fake.handle('GET', self.path, dict(self.headers))
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer((host, port), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+
+        return f"{host}:{self.__server.server_address[1]}"
+
+    def stop(self):
+        """Stops serving and closes the recording file"""
+        if self.__server:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+        if self.__record_file:
+            self.__record_file.close()
+            self.__record_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs a local stand-in Jira server')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--boards', type=int, default=5)
+    parser.add_argument('--sprints', type=int, default=40, help='sprints per board')
+    parser.add_argument('--issues', type=int, default=200, help='issues per sprint report')
+    parser.add_argument('--filters', type=int, default=500)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many random extra seconds per response')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered with a 429')
+    parser.add_argument('--retry-after', type=float, default=1)
+    parser.add_argument('--replay', help='NDJSON recording to serve')
+    parser.add_argument('--record', help='NDJSON file to record served responses to')
+    parser.add_argument('--upstream', help='real Jira base URL to forward unknown requests to, ie. https://my-jira.atlassian.net')
+    args = parser.parse_args()
+
+    fake = FakeJira(args.boards, args.sprints, args.issues, args.filters, args.page_size, args.latency, args.jitter,
+                    args.throttle_rate, args.retry_after, replay=args.replay, record=args.record, upstream=args.upstream)
+    address = fake.start(port=args.port)
+    print(f"Fake Jira listening on http://{address}, use Jira('{address}', user, token, scheme='http')")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
+
+if __name__ == '__main__':
+    main()
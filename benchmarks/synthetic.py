@@ -0,0 +1,85 @@
+import random
+
+# Rough mix of issue types and estimates seen on real boards
+ISSUE_TYPES = ["Story"] * 45 + ["Bug"] * 20 + ["Task"] * 12 + ["Design"] * 6 + ["Spike"] * 5 + ["Optimization"] * 7 + ["Epic"] * 2 + ["Sub-task"] * 3
+ESTIMATES = [None, 0, 1, 1, 2, 2, 3, 3, 3, 5, 5, 8, 13]
+
+def generateEstimate(rng):
+    """Generates an `estimateStatistic` style block, sometimes without a value like unestimated issues"""
+    value = rng.choice(ESTIMATES)
+    if value is None:
+        return {"statFieldId": "customfield_10002", "statFieldValue": {}}
+
+    return {"statFieldId": "customfield_10002", "statFieldValue": {"value": float(value), "text": str(value)}}
+
+def generateIssue(rng, key):
+    """Generates an issue as it appears in a greenhopper sprint report"""
+    original = generateEstimate(rng)
+    # Most issues keep their estimate, some get re-estimated during the sprint
+    current = original if rng.random() < 0.8 else generateEstimate(rng)
+    return {
+        "id": int(key.split('-')[1]) + 10000,
+        "key": key,
+        "hidden": False,
+        "typeName": rng.choice(ISSUE_TYPES),
+        "typeId": "10001",
+        "summary": f"Synthetic issue {key}",
+        "priorityName": rng.choice(["Low", "Medium", "High"]),
+        "done": False,
+        "assigneeName": f"user{rng.randint(1, 25)}",
+        "estimateStatistic": original,
+        "currentEstimateStatistic": current,
+        "statusName": "Done",
+        "projectId": 10000
+    }
+
+def generateSprintReport(issue_count, sprint_id=1, project_key='SYN', seed=0, state='CLOSED'):
+    """Generates a greenhopper sprint report with `issue_count` issues
+
+    Args:
+        issue_count: integer - how many issues the sprint should have
+        sprint_id: integer - the id (and number) of the sprint (defaults to 1)
+        project_key: string - prefix for issue keys (defaults to 'SYN')
+        seed: integer - seed so the same arguments always give the same report (defaults to 0)
+        state: string - the sprint's state (defaults to 'CLOSED')
+
+    Returns:
+        dictionary - a sprint report shaped like `rapid/charts/sprintreport`
+    """
+    rng = random.Random(f"{seed}-{sprint_id}-{issue_count}")
+    issues = [generateIssue(rng, f"{project_key}-{sprint_id * 1000000 + index}") for index in range(issue_count)]
+
+    completed, incomplete, removed = [], [], []
+    for issue in issues:
+        roll = rng.random()
+        if roll < 0.75:
+            issue["done"] = True
+            completed.append(issue)
+        elif roll < 0.92:
+            issue["statusName"] = "In Progress"
+            incomplete.append(issue)
+        else:
+            issue["statusName"] = "To Do"
+            removed.append(issue)
+
+    added = {issue["key"]: True for issue in issues if rng.random() < 0.2}
+
+    return {
+        "contents": {
+            "completedIssues": completed,
+            "issuesNotCompletedInCurrentSprint": incomplete,
+            "puntedIssues": removed,
+            "issuesCompletedInAnotherSprint": [],
+            "issueKeysAddedDuringSprint": added
+        },
+        "sprint": {
+            "id": sprint_id,
+            "sequence": sprint_id,
+            "name": f"{project_key} Sprint {sprint_id}",
+            "state": state,
+            "goal": f"Ship sprint {sprint_id}\nKeep the lights on",
+            "startDate": "01/Mar/21 9:00 AM",
+            "endDate": "15/Mar/21 9:00 AM"
+        },
+        "lastUserToClose": "user1"
+    }
@@ -0,0 +1,271 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from custom_jira import Error
+
+class _Job:
+    __slots__ = ('user', 'command', 'sprint_id', 'message', 'deadline', 'future')
+
+    def __init__(self, user, command, sprint_id, message, deadline):
+        self.user = user
+        self.command = command
+        self.sprint_id = sprint_id
+        self.message = message
+        self.deadline = deadline
+        self.future = Future()
+
+class CommandService:
+    """Serves bot commands from a bounded queue on a fixed pool of workers
+
+    Commands are queued per user and workers take them round-robin across users, so one person asking for a
+    quarter's worth of sprints doesn't hold everyone else up. The queue is bounded overall and per user; when it's
+    full, commands are turned away straight away with a "busy" reply instead of piling up threads behind a slow
+    Jira. Every command has a deadline, commands still queued when it passes are dropped without calling Jira, and
+    callers waiting with `handle` get a timeout reply once it passes.
+    """
+    __command_regex = re.compile(r'sprint (metrics|report) ([0-9]+)')
+
+    BUSY = {'text': "Sorry, I'm swamped right now. Please try again in a minute"}
+    USER_BUSY = {'text': "I'm still working on your earlier requests, please wait for those before asking for more"}
+    TIMEOUT = {'text': "Sorry, Jira is taking too long to answer. Please try again in a few minutes"}
+    FAILED = {'text': "Sorry, something went wrong talking to Jira. This probably isn't your fault, I've let my overlords know"}
+    UNKNOWN = {'text': "Sorry, I don't see a valid sprint number there"}
+
+    def __init__(self, jira, workers=4, queue_size=64, per_user=4, deadline=30):
+        """Creates a command service, call `start` (or use it as a context manager) before submitting commands
+
+            Args:
+                jira: Jira - the client used to answer commands
+                workers: integer - the most commands being answered at once (defaults to 4)
+                queue_size: integer - the most commands waiting across all users (defaults to 64)
+                per_user: integer - the most commands waiting for a single user (defaults to 4)
+                deadline: float - seconds a command has to be answered in (defaults to 30)
+        """
+        self.__jira = jira
+        self.__workers = workers
+        self.__queue_size = queue_size
+        self.__per_user = per_user
+        self.__deadline = deadline
+
+        self.__condition = threading.Condition()
+        self.__pending = {}
+        self.__users = deque()
+        self.__size = 0
+        self.__threads = []
+        self.__stopping = False
+        self.__stats = {'accepted': 0, 'rejected': 0, 'expired': 0, 'failed': 0, 'completed': 0}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Starts the worker threads"""
+        with self.__condition:
+            if self.__threads:
+                return
+            self.__stopping = False
+            self.__threads = [threading.Thread(target=self.__work, name=f"command-service-{index}", daemon=True) for index in range(self.__workers)]
+
+        for thread in self.__threads:
+            thread.start()
+
+    def stop(self, wait=True):
+        """Stops the workers, commands still waiting in the queue are cancelled
+
+            Args:
+                wait: boolean - wait for commands already being answered to finish (defaults to True)
+        """
+        with self.__condition:
+            self.__stopping = True
+            queued = [job for jobs in self.__pending.values() for job in jobs]
+            self.__pending.clear()
+            self.__users.clear()
+            self.__size = 0
+            self.__condition.notify_all()
+            threads, self.__threads = self.__threads, []
+
+        for job in queued:
+            job.future.cancel()
+
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def parse(self, message):
+        """Finds the command in a user's message
+
+            Args:
+                message: string - the message from the user
+
+            Returns:
+                tuple - (command, sprint_id) where command is 'metrics' or 'report', or None if there isn't one
+        """
+        match = self.__command_regex.search(message)
+        if match is None:
+            return None
+
+        return match.group(1), match.group(2)
+
+    def submit(self, user, message, deadline=None):
+        """Queues a command without waiting for it
+
+        Commands that can't be queued (unknown, queue full, user already has too many waiting) get a future that
+        already holds the reply, so callers never block here.
+
+            Args:
+                user: string - who asked, used to share workers fairly
+                message: string - the message from the user that initiated this command
+                deadline: float - seconds the command has to be answered in (defaults to the service's deadline)
+
+            Returns:
+                concurrent.futures.Future - resolves to a slack message response
+        """
+        command = self.parse(message)
+        if command is None:
+            logging.error(f"Did not find a command in: '{message}'")
+            return self.__resolved(self.UNKNOWN)
+
+        timeout = self.__deadline if deadline is None else deadline
+        job = _Job(user, command[0], command[1], message, time.monotonic() + timeout)
+
+        with self.__condition:
+            if self.__stopping or not self.__threads or self.__size >= self.__queue_size:
+                self.__stats['rejected'] += 1
+                return self.__resolved(self.BUSY)
+
+            jobs = self.__pending.get(user)
+            if jobs is not None and len(jobs) >= self.__per_user:
+                self.__stats['rejected'] += 1
+                return self.__resolved(self.USER_BUSY)
+
+            if jobs is None:
+                jobs = self.__pending[user] = deque()
+                self.__users.append(user)
+            jobs.append(job)
+            self.__size += 1
+            self.__stats['accepted'] += 1
+            self.__condition.notify()
+
+        job.future.add_done_callback(lambda future: self.__dequeue(job) if future.cancelled() else None)
+        return job.future
+
+    def handle(self, user, message, deadline=None):
+        """Answers a command, waiting no longer than its deadline
+
+            Args:
+                user: string - who asked, used to share workers fairly
+                message: string - the message from the user that initiated this command
+                deadline: float - seconds the command has to be answered in (defaults to the service's deadline)
+
+            Returns:
+                dictionary - A slack message response
+        """
+        timeout = self.__deadline if deadline is None else deadline
+        future = self.submit(user, message, timeout)
+
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            # Timed out or cancelled; a command that hasn't started yet won't be sent to Jira at all
+            future.cancel()
+            return dict(self.TIMEOUT)
+
+    @property
+    def stats(self):
+        """Counts of accepted, rejected, expired, failed and completed commands, and how many are queued right now"""
+        with self.__condition:
+            return dict(self.__stats, queued=self.__size)
+
+    @staticmethod
+    def __resolved(response):
+        future = Future()
+        future.set_result(dict(response))
+        return future
+
+    def __dequeue(self, job):
+        """Takes a cancelled command out of the queue, so it stops counting against the queue and its user's share"""
+        with self.__condition:
+            jobs = self.__pending.get(job.user)
+            if jobs is None or job not in jobs:
+                return
+
+            jobs.remove(job)
+            self.__size -= 1
+            if not jobs:
+                del self.__pending[job.user]
+                self.__users.remove(job.user)
+
+    def __next(self):
+        """Takes the next command, round-robin across users, or None once the service is stopping"""
+        with self.__condition:
+            while not self.__size and not self.__stopping:
+                self.__condition.wait()
+
+            if self.__stopping:
+                return None
+
+            user = self.__users.popleft()
+            jobs = self.__pending[user]
+            job = jobs.popleft()
+            self.__size -= 1
+            if jobs:
+                self.__users.append(user)
+            else:
+                del self.__pending[user]
+
+            return job
+
+    def __work(self):
+        while True:
+            job = self.__next()
+            if job is None:
+                return
+
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            if time.monotonic() >= job.deadline:
+                with self.__condition:
+                    self.__stats['expired'] += 1
+                job.future.set_result(dict(self.TIMEOUT))
+                continue
+
+            outcome = 'completed'
+            try:
+                response = self.__answer(job)
+            except Error as e:
+                if e.log_message:
+                    logging.error(e.log_message)
+                response = {'text': e.message}
+            except Exception:
+                logging.exception(f"Failed to answer '{job.message}' for {job.user}")
+                response = dict(self.FAILED)
+                outcome = 'failed'
+
+            with self.__condition:
+                self.__stats[outcome] += 1
+            job.future.set_result(response)
+
+    def __answer(self, job):
+        """Runs a command against Jira
+
+            Args:
+                job: _Job - the queued command
+
+            Returns:
+                dictionary - A slack message response
+        """
+        if job.command == 'metrics':
+            return self.__jira.getSprintMetricsCommand(f"sprint metrics {job.sprint_id}")
+
+        report, url = self.__jira.getSprintReportForm(job.sprint_id)
+
+        return {'text': f"Here's the sprint report for {report['project_key']} sprint {report['sprint_number']}: {url}"}
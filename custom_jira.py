@@ -1,10 +1,40 @@
-from requests.auth import HTTPBasicAuth
-import requests
 import logging
 import re
 import json
 import os
-from datetime import datetime
+import time
+import copy
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import quote, quote_plus
+
+from instrumentation import timed
+from single_flight import SingleFlight
+
+# Issue type classification flags used by `Jira.calculateSprintMetrics`
+_STORY = 1
+_FEATURE = 2
+_OPTIMIZATION = 4
+_BUG = 8
+_IGNORED = 16
+
+class Error(Exception):
+    """An error worth telling the user about
+
+        Args:
+            message: string - what to tell the user
+            log_message: string - extra detail for our logs, not shown to the user (defaults to None)
+    """
+
+    def __init__(self, message, log_message=None):
+        super().__init__(message)
+        self.message = message
+        self.log_message = log_message
+
+class SprintDataError(Error):
+    """An error in a sprint's own data (ie. a name without a sprint number) that asking Jira again won't fix"""
 
 class Jira:
     __auth = None
@@ -13,36 +43,313 @@ class Jira:
     __greenhopper_url = None
     __agile_url = None
     __prefix = ''
+    __session = None
+    __session_lock = None
+    __pool_size = 10
+    __cache = None
+    __store = None
+    __filter_index = None
+    __rate_limiter = None
+    __instrumentation = None
+    __velocity = None
+    __in_flight = None
 
     __regex = {}
     __descriptions = {}
 
-    def __makeRequest(self, verb, url, params=None):
-        """Wrapper for a simple HTTP request
+    # How issue types are bucketed when calculating sprint metrics
+    FEATURE_WORK_TYPES = ["Story", "Design", "Spike"]
+    OPTIMIZATION_TYPES = ["Optimization"]
+    BUG_TYPES = ["Bug"]
+    IGNORED_TYPES = ["Task", "Epic"]
+
+    # Status codes that are worth retrying; everything else is returned to the caller as-is
+    __retry_statuses = (429, 502, 503, 504)
+
+    # The longest we'll honour a `Retry-After` for, to guard against a broken header keeping us asleep for hours
+    __retry_after_max = 600
+
+    GOOGLE_FORM_URL = 'https://docs.google.com/forms/d/e/1FAIpQLSdF__V1ZMfl6H5q3xIQhSkeZMeCNkOHUdTBFdYA1HBavH31hA/formResponse?'
+
+    # Google Form entries for sprint report data, in the order they're sent
+    __google_form_report_entries = (
+        #TODO: We're assuming that the project name IS the team name, which isn't always the case
+        ("project_key", "entry.1082637073"),
+        ("sprint_number", "entry.1975251686")
+    )
+    __google_form_metric_entries = (
+        ("points", (
+            ("committed", 'entry.1427603868'),
+            ("completed", 'entry.1486076673'),
+            ("planned_completed", 'entry.493624591'),
+            ("unplanned_completed", 'entry.1333444050'),
+            ("feature_completed", 'entry.254612996'),
+            ("optimization_completed", 'entry.2092919144'),
+            ("not_completed", 'entry.611444996'),
+            ("removed", 'entry.976792423')
+        )),
+        ("items", (
+            ("committed", 'entry.2095001800'),
+            ("completed", 'entry.1399119358'),
+            ("planned_completed", 'entry.954885633'),
+            ("unplanned_completed", 'entry.485777497'),
+            ("stories_completed", 'entry.1980453543'),
+            ("unplanned_stories_completed", 'entry.370334542'),
+            ("bugs_completed", 'entry.448087930'),
+            ("unplanned_bugs_completed", 'entry.1252702382'),
+            ("not_completed", 'entry.128659456'),
+            ("removed", 'entry.1137054034')
+        ))
+    )
+
+    # Compiled once rather than on every command
+    __sprint_metrics_regex = re.compile(r'sprint metrics ([0-9]+)')
+    __sprint_number_regex = re.compile(r'(?i)(S|Sprint )(?P<number>\d+)')
+    __unreserved_regex = re.compile(r'[A-Za-z0-9_.~-]*\Z')
+
+    def __retryDelay(self, response, attempt):
+        """Works out how long to wait before retrying a throttled or failed request
+
+            Args:
+                response: requests.Response - the response that triggered the retry
+                attempt: integer - how many retries have already been made (starting at 0)
+
+            Returns:
+                float - number of seconds to sleep before the next attempt
+        """
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            # Jira knows when our quota frees up, retrying before then just burns another attempt. `backoff_max` only
+            # caps our own guesses, the header only gets a sanity ceiling
+            try:
+                return min(max(float(retry_after), 0), self.__retry_after_max)
+            except ValueError:
+                # Retry-After may also be an HTTP date, fall back to our own backoff for those
+                pass
+
+        return min(self.__backoff_factor * (2 ** attempt), self.__backoff_max)
+
+    def __sendRequest(self, verb, url, params=None, headers=None, stream=False):
+        """Sends an HTTP request, retrying throttled or temporarily failed attempts
+
+            Requests go through a pooled keep-alive session. Throttled (429) and temporarily unavailable
+            responses are retried, honouring `Retry-After` when Jira sends it and otherwise backing off
+            exponentially up to `backoff_max` seconds. Connection failures and timeouts are retried the same way.
 
             Args:
                 verb: string - HTTP verb as string (ie. 'GET' or 'POST')
                 url: string - URL to make HTTP requests against
                 params: dictionary - Any request parameters to pass along (defaults to None)
+                headers: dictionary - Any extra request headers to send (defaults to None)
+                stream: boolean - leave the body on the socket for the caller to read incrementally (defaults to False)
 
             Returns:
-                dictionary - A JSON represenatation of the response text, or False in the case of an error
+                requests.Response - the final response, or None if Jira could not be reached at all
+        """
+        import requests
+
+        session = self.__getSession()
+        attempt = 0
+        while True:
+            if self.__rate_limiter is not None:
+                self.__rate_limiter.acquire()
+
+            try:
+                response = session.request(verb, url, params=params, headers=headers, timeout=self.__timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.__max_retries:
+                    logging.error(f"Giving up on {verb} {url}: {e}")
+                    return None
+                delay = min(self.__backoff_factor * (2 ** attempt), self.__backoff_max)
+                status = None
+            else:
+                if response.status_code not in self.__retry_statuses or attempt >= self.__max_retries:
+                    return response
+
+                delay = self.__retryDelay(response, attempt)
+                status = response.status_code
+                response.close()
+
+            if self.__instrumentation is not None:
+                self.__instrumentation.recordRetry(verb, url, params, status)
+
+            attempt += 1
+            logging.warning(f"Retrying {verb} {url} in {delay:.2f}s (attempt {attempt} of {self.__max_retries})")
+            time.sleep(delay)
+
+    def __fetch(self, verb, url, params=None):
+        """Makes a request, going through the response cache for GET requests
+
+            Fresh cache entries are returned without touching the network. Stale entries are revalidated with a
+            conditional request so an unchanged resource costs a 304 and no body.
+
+            Args:
+                verb: string - HTTP verb as string (ie. 'GET' or 'POST')
+                url: string - URL to make HTTP requests against
+                params: dictionary - Any request parameters to pass along (defaults to None)
+
+            Returns:
+                tuple - (data, status, bytes received, cache outcome) where data is the decoded response or False,
+                and the cache outcome is 'hit', 'miss', 'revalidated' or None when the response isn't cacheable
         """
-        response = requests.request(verb, url, headers={ 'Accept': 'application/json' }, auth=self.__auth, params=params)
+        cache = self.__cache if verb == 'GET' else None
+        headers = None
+        outcome = None
+        if cache is not None:
+            cached, headers = cache.lookup(url, params)
+            if cached is not None:
+                return cached, 200, 0, 'hit'
+            # Responses that can't be served from the cache (no time-to-live and nothing to revalidate) don't count as misses
+            if headers or cache.ttlFor(url) > 0:
+                outcome = 'miss'
+
+        response = self.__sendRequest(verb, url, params, headers)
+        if response is None:
+            return False, None, 0, outcome
+
+        if response.status_code == 304 and cache is not None:
+            cached = cache.revalidated(url, params)
+            if cached is not None:
+                return cached, 304, 0, 'revalidated'
+            # The entry was evicted while we were revalidating it, ask again for the full body
+            response = self.__sendRequest(verb, url, params)
+            if response is None:
+                return False, None, 0, outcome
+
         if response.status_code == 200:
-            return(json.loads(response.text))
+            data = json.loads(response.text)
+            if cache is not None:
+                cache.store(url, params, data, response.headers)
+            return data, 200, len(response.content), outcome
         else:
             logging.error(response.text)
-            return(False)
+            return False, response.status_code, len(response.content), outcome
+
+    def __makeRequest(self, verb, url, params=None):
+        """Wrapper for a simple HTTP request
+
+            Identical GET requests made at the same time (same URL and parameters) share a single upstream call,
+            so callers must treat the returned data as read-only.
+
+            Args:
+                verb: string - HTTP verb as string (ie. 'GET' or 'POST')
+                url: string - URL to make HTTP requests against
+                params: dictionary - Any request parameters to pass along (defaults to None)
+
+            Returns:
+                dictionary - A JSON represenatation of the response text, or False in the case of an error
+        """
+        if verb != 'GET':
+            return self.__timedFetch(verb, url, params)
 
-    def __init__(self, host, user, token, prefix=False):
+        key = (url, tuple(sorted(params.items())) if params else ())
+        return self.__in_flight.do(key, self.__timedFetch, verb, url, params)[0]
+
+    def __timedFetch(self, verb, url, params=None):
+        """Makes a request, recording it when the client is instrumented
+
+            Args:
+                verb: string - HTTP verb as string (ie. 'GET' or 'POST')
+                url: string - URL to make HTTP requests against
+                params: dictionary - Any request parameters to pass along (defaults to None)
+
+            Returns:
+                dictionary - A JSON represenatation of the response text, or False in the case of an error
+        """
+        if self.__instrumentation is None:
+            return self.__fetch(verb, url, params)[0]
+
+        start = time.perf_counter()
+        data, status, size, cache = self.__fetch(verb, url, params)
+        self.__instrumentation.recordRequest(verb, url, params, status, time.perf_counter() - start, size, cache)
+        return data
+
+    def __init__(self, host, user, token, prefix=False, pool_size=10, max_retries=5, backoff_factor=0.5, backoff_max=30, timeout=60, cache=None, store=None, scheme='https', rate_limiter=None, instrumentation=None):
+        """Creates a Jira client
+
+            Args:
+                host: string - the Jira host (ie. 'my-jira-server.atlassian.net')
+                user: string - the email address of the Jira user
+                token: string - an API token for the Jira user
+                prefix: string - optional prefix for bot commands (defaults to False)
+                pool_size: integer - the number of keep-alive connections to hold open per host (defaults to 10)
+                max_retries: integer - how many times to retry a throttled or failed request (defaults to 5)
+                backoff_factor: float - base number of seconds for exponential backoff between retries (defaults to 0.5)
+                backoff_max: float - the most seconds we will ever wait between retries (defaults to 30)
+                timeout: float - seconds to wait on Jira before giving up on a single attempt (defaults to 60)
+                cache: jira_cache.ResponseCache - optional cache for GET responses (defaults to None, no caching)
+                store: sprint_store.SprintReportStore - optional persistent store for closed sprints (defaults to None)
+                scheme: string - URL scheme to talk to Jira with, only worth changing for a local stand-in server (defaults to 'https')
+                rate_limiter: rate_limiter.RateLimiter - optional limiter every request (and retry) waits on, share one to keep many clients under a single quota (defaults to None)
+                instrumentation: instrumentation.Instrumentation - optional collector for request and timing metrics (defaults to None)
+        """
         self.__host = host
-        self.__auth = HTTPBasicAuth(user, token)
+        self.__auth = (user, token)
         self.__prefix = f'{prefix} ' if prefix else ''
 
-        self.__url = f"https://{self.__host}/rest/api/latest/"
-        self.__agile_url = f"https://{self.__host}/rest/agile/latest/"
-        self.__greenhopper_url = f"https://{self.__host}/rest/greenhopper/latest/"
+        self.__max_retries = max_retries
+        self.__backoff_factor = backoff_factor
+        self.__backoff_max = backoff_max
+        self.__timeout = timeout
+        self.__cache = cache
+        self.__store = store
+        self.__rate_limiter = rate_limiter
+        self.__instrumentation = instrumentation
+        self.__velocity = {}
+        self.__in_flight = SingleFlight()
+
+        # The session (and with it `requests`) is only created once we actually talk to Jira, so commands answered
+        # from the store start quickly
+        self.__pool_size = pool_size
+        self.__session_lock = threading.Lock()
+
+        self.__url = f"{scheme}://{self.__host}/rest/api/latest/"
+        self.__agile_url = f"{scheme}://{self.__host}/rest/agile/latest/"
+        self.__greenhopper_url = f"{scheme}://{self.__host}/rest/greenhopper/latest/"
+
+    def __getSession(self):
+        """Gets the pooled session, creating it on first use
+
+            Returns:
+                requests.Session - a session shared by every request this client makes
+        """
+        if self.__session is not None:
+            return self.__session
+
+        with self.__session_lock:
+            if self.__session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                # A single session re-uses TCP/TLS connections across calls instead of a fresh handshake per request
+                session = requests.Session()
+                session.auth = self.__auth
+                session.headers.update({
+                    'Accept': 'application/json',
+                    'Accept-Encoding': 'gzip, deflate',
+                    'Connection': 'keep-alive'
+                })
+                adapter = HTTPAdapter(pool_connections=self.__pool_size, pool_maxsize=self.__pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self.__session = session
+
+        return self.__session
+
+    @property
+    def cache(self):
+        """The response cache in use, or None if responses aren't cached"""
+        return self.__cache
+
+    @property
+    def instrumentation(self):
+        """The request and timing metrics collector, or None if the client isn't instrumented"""
+        return self.__instrumentation
+
+    @property
+    def store(self):
+        """The persistent store for closed sprints, or None if there isn't one"""
+        return self.__store
 
     def testConnection(self):
         """Tests the connection to Jira by getting user data"""
@@ -52,170 +359,209 @@ class Jira:
 
         return response
 
+    def __issueTypeFlags(self):
+        """Builds the lookup table used to classify issue types when calculating sprint metrics
+
+            Returns:
+                dictionary - issue type name to a bitmask of the `_STORY`, `_FEATURE`, `_OPTIMIZATION`, `_BUG` and `_IGNORED` flags
+        """
+        flags = {"Story": _STORY}
+        for types, flag in (
+            (self.FEATURE_WORK_TYPES, _FEATURE),
+            (self.OPTIMIZATION_TYPES, _OPTIMIZATION),
+            (self.BUG_TYPES, _BUG),
+            (self.IGNORED_TYPES, _IGNORED)
+        ):
+            for type_name in types:
+                flags[type_name] = flags.get(type_name, 0) | flag
+
+        return flags
+
+    @timed
     def calculateSprintMetrics(self, sprint_report):
         """Given the data from a Jira sprint report, calculates sprint metrics
 
+        Each issue is visited once, its type is classified with a single table lookup and counters are kept in
+        locals until the end. See `benchmarks/bench_sprint_metrics.py` for throughput against the original implementation.
+
         Args:
             sprint_report: dictionary - the data from a Jira sprint reports
 
         Returns:
             dictionary - calculated metrics
         """
-        points = {
-            "committed": 0,
-            "completed": 0,
-            "planned_completed": 0,
-            "unplanned_completed": 0,
-            "feature_completed": 0,
-            "optimization_completed": 0,
-            "not_completed": 0,
-            "removed": 0
-        }
+        contents = sprint_report["contents"]
+        added = contents["issueKeysAddedDuringSprint"]
+        type_flags = self.__issueTypeFlags()
+        # Anything that isn't a number (missing, None, junk) counts as an unestimated issue
+        bad_estimate = (KeyError, TypeError, AttributeError, ValueError, OverflowError)
 
-        items = {
-            "committed": 0,
-            "completed": 0,
-            "planned_completed": 0,
-            "unplanned_completed": 0,
-            "stories_completed": 0,
-            "unplanned_stories_completed": 0,
-            "bugs_completed": 0,
-            "unplanned_bugs_completed": 0,
-            "not_completed": 0,
-            "removed": 0
-        }
+        committed_keys = []
+        completed_keys = []
+        incomplete_keys = []
+        removed_keys = []
 
-        issue_keys = {
-            "committed": [],
-            "completed": [],
-            "incomplete": [],
-            "removed": []
-        }
+        points_committed = points_completed = points_planned_completed = points_unplanned_completed = 0
+        points_feature_completed = points_optimization_completed = points_not_completed = points_removed = 0
 
-        feature_work = ["Story", "Design", "Spike"]
-        optimization = ["Optimization"]
-        bug = ["Bug"]
-        ignore = ["Task", "Epic"]
+        items_committed = items_completed = items_planned_completed = items_unplanned_completed = 0
+        items_stories_completed = items_unplanned_stories_completed = 0
+        items_bugs_completed = items_unplanned_bugs_completed = 0
+        items_not_completed = items_removed = 0
 
         # Completed Work
-        for completed in sprint_report["contents"]["completedIssues"]:
-            issue_keys["completed"].append(completed["key"])
+        for completed in contents["completedIssues"]:
+            key = completed["key"]
+            completed_keys.append(key)
 
             # Short-circuit for things we don't track
-            if completed["typeName"] in ignore:
+            flags = type_flags.get(completed["typeName"], 0)
+            if flags & _IGNORED:
                 continue
 
             try:
-                issue_points_original = int(completed["estimateStatistic"]["statFieldValue"]["value"])
-            except:
+                issue_points_original = int(completed["estimateStatistic"]["statFieldValue"].get("value", 0))
+            except bad_estimate:
                 issue_points_original = 0
 
             try:
-                issue_points = int(completed["currentEstimateStatistic"]["statFieldValue"]["value"])
-            except:
+                issue_points = int(completed["currentEstimateStatistic"]["statFieldValue"].get("value", 0))
+            except bad_estimate:
                 issue_points = 0
 
-            points["completed"] += issue_points
-            items["completed"] += 1
+            points_completed += issue_points
+            items_completed += 1
 
-            unplanned = False
-            if completed["key"] in sprint_report["contents"]["issueKeysAddedDuringSprint"].keys():
-                unplanned = True
-                points["unplanned_completed"] += issue_points
-                items["unplanned_completed"] += 1
+            unplanned = key in added
+            if unplanned:
+                points_unplanned_completed += issue_points
+                items_unplanned_completed += 1
             else:
-                issue_keys["committed"].append(completed["key"])
-                points["committed"] += issue_points_original
-                items["committed"] += 1
-                points["planned_completed"] += issue_points
-                items["planned_completed"] += 1
+                committed_keys.append(key)
+                points_committed += issue_points_original
+                items_committed += 1
+                points_planned_completed += issue_points
+                items_planned_completed += 1
                 if issue_points_original < issue_points:
-                    points["unplanned_completed"] += issue_points-issue_points_original
+                    points_unplanned_completed += issue_points - issue_points_original
 
-            # Story
-            if completed["typeName"] == "Story":
-                items["stories_completed"] += 1
+            if flags & _STORY:
+                items_stories_completed += 1
                 if unplanned:
-                    items["unplanned_stories_completed"] += 1
+                    items_unplanned_stories_completed += 1
 
-            # Story / Design / Spike (Feature Work)
-            if completed["typeName"] in feature_work:
-                points["feature_completed"] += issue_points
+            if flags & _FEATURE:
+                points_feature_completed += issue_points
 
-            # Optimization
-            if completed["typeName"] in optimization:
-                points["optimization_completed"] += issue_points
+            if flags & _OPTIMIZATION:
+                points_optimization_completed += issue_points
 
-            # Bugs
-            if completed["typeName"] in bug:
-                items["bugs_completed"] += 1
+            if flags & _BUG:
+                items_bugs_completed += 1
                 if unplanned:
-                    items["unplanned_bugs_completed"] += 1
-
+                    items_unplanned_bugs_completed += 1
 
         # Incomplete Work
-        for incomplete in sprint_report["contents"]["issuesNotCompletedInCurrentSprint"]:
+        for incomplete in contents["issuesNotCompletedInCurrentSprint"]:
+            key = incomplete["key"]
+            incomplete_keys.append(key)
 
-            issue_keys["incomplete"].append(incomplete["key"])
-
-            # Short-circuit for things we don't track
-            if incomplete["typeName"] in ignore:
+            if type_flags.get(incomplete["typeName"], 0) & _IGNORED:
                 continue
 
             try:
-                issue_points = int(incomplete["currentEstimateStatistic"]["statFieldValue"]["value"])
-            except:
+                issue_points = int(incomplete["currentEstimateStatistic"]["statFieldValue"].get("value", 0))
+            except bad_estimate:
                 issue_points = 0
 
-            points["not_completed"] += issue_points
-            items["not_completed"] += 1
+            points_not_completed += issue_points
+            items_not_completed += 1
 
-            if incomplete["key"] not in sprint_report["contents"]["issueKeysAddedDuringSprint"].keys():
-                issue_keys["committed"].append(incomplete["key"])
-                points["committed"] += issue_points
-                items["committed"] += 1
+            if key not in added:
+                committed_keys.append(key)
+                points_committed += issue_points
+                items_committed += 1
 
         # Removed Work
-        for removed in sprint_report["contents"]["puntedIssues"]:
-
-            issue_keys["removed"].append(removed["key"])
+        for removed in contents["puntedIssues"]:
+            key = removed["key"]
+            removed_keys.append(key)
 
-            # Short-circuit for things we don't track
-            if removed["typeName"] in ignore:
+            if type_flags.get(removed["typeName"], 0) & _IGNORED:
                 continue
 
             try:
-                issue_points = int(removed["currentEstimateStatistic"]["statFieldValue"]["value"])
-            except:
+                issue_points = int(removed["currentEstimateStatistic"]["statFieldValue"].get("value", 0))
+            except bad_estimate:
                 issue_points = 0
 
-            if removed["key"] not in sprint_report["contents"]["issueKeysAddedDuringSprint"].keys():
-                points["committed"] += issue_points
-                items["committed"] += 1
-                issue_keys["committed"].append(removed["key"])
+            if key not in added:
+                points_committed += issue_points
+                items_committed += 1
+                committed_keys.append(key)
 
-            points["removed"] += issue_points
-            items["removed"] += 1
+            points_removed += issue_points
+            items_removed += 1
 
         meta = {
             "predictability": 0,
             "predictability_of_commitments": 0
         }
 
-        if points['committed'] != 0:
-            meta['predictability'] = int(points['completed']/points['committed']*100)
-            meta['predictability_of_commitments'] = int(points['planned_completed']/points['committed']*100)
+        if points_committed != 0:
+            meta['predictability'] = int(points_completed/points_committed*100)
+            meta['predictability_of_commitments'] = int(points_planned_completed/points_committed*100)
         else:
             # If a sprint has no points committed, we say the predictability is 0
             logging.warning('This sprint had no commitments, predictability is 0')
 
         return {
-            "points" : points,
-            "items" : items,
-            "issue_keys": issue_keys,
+            "points" : {
+                "committed": points_committed,
+                "completed": points_completed,
+                "planned_completed": points_planned_completed,
+                "unplanned_completed": points_unplanned_completed,
+                "feature_completed": points_feature_completed,
+                "optimization_completed": points_optimization_completed,
+                "not_completed": points_not_completed,
+                "removed": points_removed
+            },
+            "items" : {
+                "committed": items_committed,
+                "completed": items_completed,
+                "planned_completed": items_planned_completed,
+                "unplanned_completed": items_unplanned_completed,
+                "stories_completed": items_stories_completed,
+                "unplanned_stories_completed": items_unplanned_stories_completed,
+                "bugs_completed": items_bugs_completed,
+                "unplanned_bugs_completed": items_unplanned_bugs_completed,
+                "not_completed": items_not_completed,
+                "removed": items_removed
+            },
+            "issue_keys": {
+                "committed": committed_keys,
+                "completed": completed_keys,
+                "incomplete": incomplete_keys,
+                "removed": removed_keys
+            },
             "meta": meta
         }
 
+    def calculateSprintMetricsBatch(self, sprint_reports):
+        """Given the data from many Jira sprint reports, calculates sprint metrics for all of them at once
+
+        Needs numpy, see `sprint_metrics_batch` for details.
+
+        Args:
+            sprint_reports: iterable - the data from Jira sprint reports
+
+        Returns:
+            list - calculated metrics for each sprint report, in order, as `calculateSprintMetrics` would return them
+        """
+        from sprint_metrics_batch import calculateSprintMetricsBatch
+
+        return calculateSprintMetricsBatch(sprint_reports)
+
     def getSprint(self, sprint_id):
         """Utility funtion to get sprint data from Jira
 
@@ -225,11 +571,19 @@ class Jira:
         Returns:
             dictionary - A JSON encoded represenatation of the Jira sprint object
         """
+        if self.__store is not None:
+            sprint = self.__store.getSprint(sprint_id)
+            if sprint:
+                return sprint
+
         # Get Jira Sprint Object (including Board reference) from Sprint ID
         sprint = self.__makeRequest('GET', f"{self.__agile_url}sprint/{sprint_id}")
         if not sprint:
             raise Error(f"I could not find sprint with id {sprint_id}. Please check your arguments again. Are you using the right command for your jira instance? Ask me for `help` for more information")
 
+        if self.__store is not None and self.__store.isClosed(sprint):
+            self.__store.saveSprint(sprint)
+
         return sprint
 
     def getBoard(self, board_id):
@@ -247,6 +601,7 @@ class Jira:
 
         return board
 
+    @timed
     def getSprintReport(self, sprint_id, board_id):
         """Utility funtion to get sprint report data from Jira
 
@@ -257,12 +612,137 @@ class Jira:
         Returns:
             dictionary - A JSON encoded represenatation of a Jira Sprint Report for the given sprint and board
         """
+        if self.__store is not None:
+            sprint_report = self.__store.getReport(board_id, sprint_id)
+            if sprint_report:
+                return sprint_report
+
         sprint_report = self.__makeRequest('GET',f"{self.__greenhopper_url}rapid/charts/sprintreport?rapidViewId={board_id}&sprintId={sprint_id}")
         if not sprint_report:
             raise Error(f"Could not find report for sprint {sprint_id} on board {board_id}. Please check your arguments again. Are you using the right command for your jira instance? Ask me for `help` for more information")
 
+        # Closed sprint reports never change, so we keep them rather than downloading them again
+        if self.__store is not None and self.__store.isClosed(sprint_report.get('sprint', {})):
+            self.__store.saveReport(board_id, sprint_id, sprint_report)
+
+        return sprint_report
+
+    def iterateSprintReport(self, sprint_id, board_id):
+        """Streams a Jira sprint report, decoding it incrementally straight off of the socket
+
+        Issues are yielded one at a time as they're parsed, so the raw payload and the full document are never held
+        in memory at once. Needs ijson (`pipenv install ijson`).
+
+        Args:
+            sprint_id: string - the id of a Jira sprint
+            board_id: string - the id of a Jira board
+
+        Yields:
+            tuple - (section, value) where section is 'completedIssues', 'issuesNotCompletedInCurrentSprint' or
+            'puntedIssues' and value is a single issue, or section is 'issueKeysAddedDuringSprint' or 'sprint' and
+            value is that whole (small) section
+        """
+        import ijson
+
+        response = self.__sendRequest('GET', f"{self.__greenhopper_url}rapid/charts/sprintreport?rapidViewId={board_id}&sprintId={sprint_id}", stream=True)
+        if response is None or response.status_code != 200:
+            if response is not None:
+                logging.error(response.text)
+            raise Error(f"Could not find report for sprint {sprint_id} on board {board_id}. Please check your arguments again. Are you using the right command for your jira instance? Ask me for `help` for more information")
+
+        sections = {
+            'contents.completedIssues.item': 'completedIssues',
+            'contents.issuesNotCompletedInCurrentSprint.item': 'issuesNotCompletedInCurrentSprint',
+            'contents.puntedIssues.item': 'puntedIssues',
+            'contents.issueKeysAddedDuringSprint': 'issueKeysAddedDuringSprint',
+            'sprint': 'sprint'
+        }
+
+        # Let urllib3 gunzip the body as ijson reads it
+        response.raw.decode_content = True
+        try:
+            builder = None
+            for prefix, event, value in ijson.parse(response.raw, use_float=True):
+                if builder is None:
+                    if event == 'start_map' and prefix in sections:
+                        builder, section, section_prefix = ijson.ObjectBuilder(), sections[prefix], prefix
+                    else:
+                        continue
+
+                builder.event(event, value)
+                if event == 'end_map' and prefix == section_prefix:
+                    yield section, builder.value
+                    builder = None
+        finally:
+            response.close()
+            if self.__instrumentation is not None:
+                self.__instrumentation.recordRequest('GET', response.url, None, response.status_code, response.elapsed.total_seconds(), response.raw.tell())
+
+    def __streamCompactSprintReport(self, sprint_id, board_id):
+        """Builds a sprint report with only the fields `calculateSprintMetrics` needs by streaming it from Jira
+
+            Args:
+                sprint_id: string - the id of a Jira sprint
+                board_id: string - the id of a Jira board
+
+            Returns:
+                dictionary - a sprint report with the same shape as `getSprintReport`, minus everything metrics don't use
+        """
+        sprint_report = {
+            'sprint': {},
+            'contents': {
+                'completedIssues': [],
+                'issuesNotCompletedInCurrentSprint': [],
+                'puntedIssues': [],
+                'issueKeysAddedDuringSprint': {}
+            }
+        }
+
+        for section, value in self.iterateSprintReport(sprint_id, board_id):
+            if section == 'sprint':
+                sprint_report['sprint'] = value
+            elif section == 'issueKeysAddedDuringSprint':
+                sprint_report['contents'][section] = value
+            else:
+                sprint_report['contents'][section].append({
+                    'key': value['key'],
+                    'typeName': value['typeName'],
+                    'estimateStatistic': value.get('estimateStatistic'),
+                    'currentEstimateStatistic': value.get('currentEstimateStatistic')
+                })
+
         return sprint_report
 
+    @timed
+    def getSprintMetrics(self, sprint_id, board_id, sprint_report=None, stream=False):
+        """Utility funtion to get the calculated metrics for a sprint, using stored metrics for closed sprints
+
+        Args:
+            sprint_id: string - the id of a Jira sprint
+            board_id: string - the id of a Jira board
+            sprint_report: dictionary - the sprint report, if the caller already has it (defaults to None)
+            stream: boolean - stream the sprint report and keep only what metrics need, for very large sprints (defaults to False)
+
+        Returns:
+            dictionary - calculated metrics, as returned by `calculateSprintMetrics`
+        """
+        if self.__store is not None:
+            metrics = self.__store.getMetrics(board_id, sprint_id)
+            if metrics:
+                return metrics
+
+        if sprint_report is None and stream:
+            sprint_report = self.__streamCompactSprintReport(sprint_id, board_id)
+        elif sprint_report is None:
+            sprint_report = self.getSprintReport(sprint_id, board_id)
+
+        metrics = self.calculateSprintMetrics(sprint_report)
+
+        if self.__store is not None and self.__store.isClosed(sprint_report.get('sprint', {})):
+            self.__store.saveMetrics(board_id, sprint_id, metrics)
+
+        return metrics
+
     def getSprintMetricsCommand(self, message):
         """User-friendly wrapper for getting the metrics for a given sprint
 
@@ -273,14 +753,27 @@ class Jira:
             dictionary - A slack message response
         """
         try:
-            sprintid = re.search('sprint metrics ([0-9]+)', message).group(1)
+            sprintid = self.__sprint_metrics_regex.search(message).group(1)
         except :
             logging.error(f"Did not find a sprint number in: '{message}'")
             return {'text': "Sorry, I don't see a valid sprint number there"}
 
-        sprint = self.getSprint(sprintid)
-        sprint_report = self.getSprintReport(sprintid, sprint['originBoardId'])
-        metrics = self.calculateSprintMetrics(sprint_report)
+        # Everyone asking about the same sprint at the same time shares one lookup
+        response, _ = self.__in_flight.do(('sprint metrics', sprintid), self.__sprintMetricsText, sprintid)
+
+        return dict(response)
+
+    def __sprintMetricsText(self, sprint_id):
+        """Builds the slack response for `getSprintMetricsCommand`
+
+            Args:
+                sprint_id: string - the id of a Jira sprint
+
+            Returns:
+                dictionary - A slack message response
+        """
+        sprint = self.getSprint(sprint_id)
+        metrics = self.getSprintMetrics(sprint_id, sprint['originBoardId'])
 
         metrics_text = json.dumps(metrics, sort_keys=True, indent=4, separators=(",", ": "))
 
@@ -298,9 +791,9 @@ class Jira:
         report = {}
 
         try:
-            report['sprint_number'] = re.search(r'(?i)(S|Sprint )(?P<number>\d+)', sprint_report["sprint"]["name"]).group('number')
+            report['sprint_number'] = self.__sprint_number_regex.search(sprint_report["sprint"]["name"]).group('number')
         except AttributeError:
-            raise Error(f"I couldn't not find or parse sprint number from: '{sprint_report['sprint']['name']}'. Please make sure that you name sprints to include `S#` or `Sprint #`, where `#` is the number of the sprint")
+            raise SprintDataError(f"I couldn't not find or parse sprint number from: '{sprint_report['sprint']['name']}'. Please make sure that you name sprints to include `S#` or `Sprint #`, where `#` is the number of the sprint")
 
         try:
             report['sprint_start'] = sprint_report['sprint']['startDate']
@@ -312,62 +805,156 @@ class Jira:
         try:
             report['sprint_goals'] = sprint_report['sprint']['goal'].split("\n")
         except (AttributeError, KeyError):
-            raise Error(f"I couldn't find or parse sprint goal for one of your sprints. Please check your arguments again, but this might not be your fault so I've let my overlords know. Are you using the right command for your jira instance? Ask me for `help` for more information", f"Unable to find or parse sprint goal\n {sprint_report}")
+            raise SprintDataError(f"I couldn't find or parse sprint goal for one of your sprints. Please check your arguments again, but this might not be your fault so I've let my overlords know. Are you using the right command for your jira instance? Ask me for `help` for more information", f"Unable to find or parse sprint goal\n {sprint_report}")
 
         return report
 
+    @timed
     def generateAllSprintReportData(self, sprint_id):
         """Congomerates all the data from different Jira reports into one holistic Sprint Report data-set
 
+        Concurrent calls for the same sprint share one set of lookups, each caller gets its own copy of the result.
+
         Args:
             sprint_id: string - the id of a Jira sprint
 
         Returns:
             dictionary - the information necessary for creating an AgileOps Sprint Report
         """
+        report, _ = self.__coalescedSprintReportData(sprint_id)
+
+        return report
+
+    def __coalescedSprintReportData(self, sprint_id):
+        """Builds sprint report data, sharing one build between everyone asking for the same sprint at once
+
+            Returns:
+                tuple - (report, sprint) where report is the caller's own copy, and sprint is the agile sprint object
+                        or None if the report came out of the store
+        """
+        (report, sprint), _ = self.__in_flight.do(('sprint report', str(sprint_id)), self.__generateAllSprintReportData, sprint_id)
+
+        # The coalesced result is never handed out itself, so one caller mutating its copy (ie. `BatchReportRunner`
+        # adding keys) can't race with another caller copying it
+        return copy.deepcopy(report), sprint
+
+    def __generateAllSprintReportData(self, sprint_id):
+        if self.__store is not None:
+            materialized = self.__store.getReportData(sprint_id)
+            if materialized:
+                return materialized[0], None
+
         report = {}
 
         sprint = self.getSprint(sprint_id)
         sprint_report = self.getSprintReport(sprint_id, sprint['originBoardId'])
         report = self.getJiraSprintReportData(sprint_report)
-        report['issue_metrics'] = self.calculateSprintMetrics(sprint_report)
+        report['issue_metrics'] = self.getSprintMetrics(sprint_id, sprint['originBoardId'], sprint_report)
         board = self.getBoard(sprint['originBoardId'])
         report['project_name'] = board['location']['projectName']
         report['project_key'] = board['location']['projectKey']
         report['average_velocity'] = self.getAverageVelocity(sprint['originBoardId'], sprint_id)
 
-        return report
+        return report, sprint
 
-    def getAverageVelocity(self, board_id, sprint_id = None):
-        """"Gets the 3 sprint average velocity for a board as of a specific sprint
+    def getSprintReportForm(self, sprint_id):
+        """Gets the sprint report data for a sprint along with its pre-populated Google Form URL
+
+        Closed sprints are materialized in the store the first time they're asked for (or ahead of time by
+        `precompute.PrecomputeScheduler`) and answered from there afterwards.
+
+        Args:
+            sprint_id: string - the id of a Jira sprint
+
+        Returns:
+            tuple - (report_data, form_url) as built by `generateAllSprintReportData` and `generateGoogleFormURL`
+        """
+        if self.__store is not None:
+            materialized = self.__store.getReportData(sprint_id)
+            if materialized:
+                return materialized
+
+        report, sprint = self.__coalescedSprintReportData(sprint_id)
+        url = self.generateGoogleFormURL(report)
+
+        # No sprint means the report came out of the store, so there's nothing to save
+        if self.__store is not None and sprint is not None and self.__store.isClosed(sprint):
+            self.__store.saveReportData(sprint['originBoardId'], sprint_id, report, url)
+
+        return report, url
+
+    @timed
+    def getRollingVelocity(self, board_id, sprints=3, refresh=False):
+        """Gets the rolling average velocity as of every sprint on a board from a single velocity chart
+
+        The chart is fetched once and averaged in one pass with prefix sums. Results are memoized per board and
+        window size until `refresh` is asked for (or `clearVelocity` is called).
 
         Args:
             board_id: string - the id of a Jira board
-            sprint_id: string - the id of a Jira sprint (defaults to None, in which case it assumes the most recently completely sprint)
+            sprints: integer - how many sprints to average over (defaults to 3)
+            refresh: boolean - ignore any memoized result and fetch the chart again (defaults to False)
 
         Returns:
-            integer - The 3 sprint average velocity for the board_id as of the sprint_id provided
+            dictionary - sprint id (as a string) to the average velocity as of that sprint, ordered oldest sprint first
         """
+        key = (str(board_id), sprints)
+        if not refresh and key in self.__velocity:
+            return self.__velocity[key]
+
         velocity_report = self.__makeRequest('GET',f"{self.__greenhopper_url}rapid/charts/velocity?rapidViewId={board_id}")
 
         if velocity_report == False:
             raise Error(f"I wasn't able to get the velocity report for board {board_id}. Please check your arguments again. Are you using the right command for your jira instance? Ask me for `help` for more information")
 
-        total = 0
-        sprints = 0
-        found_sprint = True if sprint_id == None else False
+        entries = velocity_report['velocityStatEntries']
+        # Sprint ids are strings in the chart, sort them numerically so '998' doesn't come after '1002'
+        sprint_ids = sorted(entries, key=int)
+
+        prefix = [0]
+        for sprint_id in sprint_ids:
+            prefix.append(prefix[-1] + entries[sprint_id]['completed']['value'])
+
+        rolling = {}
+        for index, sprint_id in enumerate(sprint_ids):
+            start = max(0, index - sprints + 1)
+            rolling[sprint_id] = int((prefix[index + 1] - prefix[start]) / (index + 1 - start))
 
-        for sprint in sorted(velocity_report['velocityStatEntries'], reverse=True):
-            if sprints >= 3:
-                # We only care about the last three sprints
-                break;
+        self.__velocity[key] = rolling
+        return rolling
 
-            if found_sprint == True or sprint_id == sprint:
-                found_sprint = True
-                total = total +  velocity_report['velocityStatEntries'][sprint]['completed']['value']
-                sprints = sprints + 1
+    def clearVelocity(self, board_id=None):
+        """Forgets memoized rolling velocities
 
-        return int(total/sprints) if sprints > 0 else total
+        Args:
+            board_id: string - the id of a Jira board (defaults to None, in which case every board is forgotten)
+        """
+        for key in list(self.__velocity):
+            if board_id is None or key[0] == str(board_id):
+                self.__velocity.pop(key, None)
+
+    @timed
+    def getAverageVelocity(self, board_id, sprint_id = None):
+        """"Gets the 3 sprint average velocity for a board as of a specific sprint
+
+        Args:
+            board_id: string - the id of a Jira board
+            sprint_id: string - the id of a Jira sprint (defaults to None, in which case it assumes the most recently completely sprint)
+
+        Returns:
+            integer - The 3 sprint average velocity for the board_id as of the sprint_id provided
+        """
+        # The most recent sprint, or one we haven't seen yet, may have closed since we memoized the chart. Only a
+        # memoized chart is worth fetching again; a fresh one missing the sprint just means it hasn't closed yet
+        memoized = sprint_id is not None and (str(board_id), 3) in self.__velocity
+        rolling = self.getRollingVelocity(board_id, refresh=sprint_id is None)
+        if memoized and str(sprint_id) not in rolling:
+            rolling = self.getRollingVelocity(board_id, refresh=True)
+
+        if sprint_id is None:
+            return rolling[next(reversed(rolling))] if rolling else 0
+
+        return rolling.get(str(sprint_id), 0)
 
     def generateGoogleFormURL(self, sprint_report_data):
         """Generates a URL that will pre-populate a specific AgileOps Google Form where teams submit their sprint metrics
@@ -378,53 +965,22 @@ class Jira:
         Returns:
             string - A URL to a google form with relevant information pre-populate via query parameters
         """
-        url = 'https://docs.google.com/forms/d/e/1FAIpQLSdF__V1ZMfl6H5q3xIQhSkeZMeCNkOHUdTBFdYA1HBavH31hA/formResponse?'
-
-        google_entry_translations = {
-        "issue_metrics": {
-            "items": {
-                "bugs_completed": 'entry.448087930',
-                "committed": 'entry.2095001800',
-                "completed": 'entry.1399119358',
-                "not_completed": 'entry.128659456',
-                "planned_completed": 'entry.954885633',
-                "removed": 'entry.1137054034',
-                "stories_completed": 'entry.1980453543',
-                "unplanned_bugs_completed": 'entry.1252702382',
-                "unplanned_completed": 'entry.485777497',
-                "unplanned_stories_completed": 'entry.370334542'
-            },
-            "points": {
-                "committed": 'entry.1427603868',
-                "completed": 'entry.1486076673',
-                "feature_completed": 'entry.254612996',
-                "not_completed": 'entry.611444996',
-                "optimization_completed": 'entry.2092919144',
-                "planned_completed": 'entry.493624591',
-                "removed": 'entry.976792423',
-                "unplanned_completed": 'entry.1333444050'
-            }
-        },
-        #TODO: We're assuming that the project name IS the team name, which isn't always the case
-        "project_key": "entry.1082637073",
-        "sprint_number": "entry.1975251686"
-        }
-
         try:
-            for entry in ["project_key", "sprint_number"]:
-                url += f"{google_entry_translations[entry]}={sprint_report_data[entry]}&"
-
-            for metric_type in sprint_report_data['issue_metrics'].keys():
-                if metric_type in ["meta", "issue_keys"]:
-                    continue
-                for item in sprint_report_data['issue_metrics'][metric_type].keys():
-                    url += f"{google_entry_translations['issue_metrics'][metric_type][item]}={sprint_report_data['issue_metrics'][metric_type][item]}&"
+            params = [f"{entry}={quote_plus(str(sprint_report_data[field]))}" for field, entry in self.__google_form_report_entries]
+
+            issue_metrics = sprint_report_data['issue_metrics']
+            for metric_type, entries in self.__google_form_metric_entries:
+                metrics = issue_metrics[metric_type]
+                for item, entry in entries:
+                    value = metrics[item]
+                    # Metrics are numbers, which never need quoting
+                    params.append(f"{entry}={value}" if isinstance(value, (int, float)) else f"{entry}={quote_plus(str(value))}")
         except (KeyError):
             raise Error("I wasn't able to generate a Google Form URl for some reason. This probably isn't your fault, I've let my overlords know.", "Unable to generate Google Form URL, expected keys missing")
 
-        url += "submit=Submit"
+        params.append("submit=Submit")
 
-        return url
+        return self.GOOGLE_FORM_URL + "&".join(params)
 
     def generateJiraIssueLink(self, issues):
         """Generates a link to a collection of Jira issues
@@ -435,14 +991,72 @@ class Jira:
         Returns:
             string - A Jira link that will display the passed in issues
         """
-        link =  f"https://{self.__host}/issues/?jql=issueKey%20in%20("
+        return f"https://{self.__host}/issues/?jql=issueKey%20in%20(" + "%2C".join(self.__quoteIssueKeys(issues)) + ")"
+
+    def __quoteIssueKeys(self, issues):
+        """URL-encodes issue keys, which are almost always plain `ABC-123` keys that don't need it
+
+        Args:
+            issues: list - Jira issue id's
+
+        Returns:
+            list - the URL-encoded keys
+        """
+        keys = [str(issue) for issue in issues]
+        if self.__unreserved_regex.match("".join(keys)):
+            return keys
 
-        for issue in issues:
-            link += f"{issue}%2C"
+        return [quote(key, safe='') for key in keys]
+
+    def generateJiraIssueLinks(self, issues, max_length=2000):
+        """Generates links to a collection of Jira issues, split so that no link is longer than `max_length`
+
+        Browsers, proxies and Slack all start dropping URLs somewhere past 2000 characters, which a few hundred issue
+        keys easily get to.
+
+        Args:
+            issues: list - Jira issue id's
+            max_length: integer - the longest a single link may be (defaults to 2000)
+
+        Returns:
+            list - Jira links that together display the passed in issues, empty if there are no issues
+        """
+        prefix = f"https://{self.__host}/issues/?jql=issueKey%20in%20("
+        budget = max_length - len(prefix) - 1
 
-        link = re.sub(r'\%2C$', '', link) + ")"
+        links = []
+        chunk = []
+        length = 0
+        for key in self.__quoteIssueKeys(issues):
+            # Every key after the first in a link also needs a separator
+            needed = len(key) + (3 if chunk else 0)
+            if chunk and length + needed > budget:
+                links.append(prefix + "%2C".join(chunk) + ")")
+                chunk, length, needed = [], 0, len(key)
+            chunk.append(key)
+            length += needed
 
-        return link
+        if chunk:
+            links.append(prefix + "%2C".join(chunk) + ")")
+
+        return links
+
+    def generateReportLinks(self, sprint_report_datas, max_length=2000):
+        """Builds the Google Form URL and Jira issue links for many sprint reports at once, ie. when backfilling
+
+        Args:
+            sprint_report_datas: iterable - AgileOps Sprint Report Data, as built by `generateAllSprintReportData`
+            max_length: integer - the longest a single issue link may be (defaults to 2000)
+
+        Yields:
+            dictionary - {'form_url': string, 'issue_links': {'committed': list, 'completed': list, ...}} for each report
+        """
+        for sprint_report_data in sprint_report_datas:
+            issue_keys = sprint_report_data['issue_metrics']['issue_keys']
+            yield {
+                'form_url': self.generateGoogleFormURL(sprint_report_data),
+                'issue_links': {category: self.generateJiraIssueLinks(keys, max_length) for category, keys in issue_keys.items()}
+            }
 
     def getBoardsInProject(self, projectkey):
         link = ""
@@ -456,25 +1070,110 @@ class Jira:
 
         return False
 
-    def getSprintsInBoard(self, board_id):
-        # We handle pagination by using `startAt`.
-        # Because how sprints are returned (oldest first) we will reverse the list before return.
-        link = f"{self.__agile_url}board/{board_id}/sprint"
-        sprints = []
-        startAt = 0
-        while True:
-            # Get list of sprints, if this is not the start, then start at `startAt`
-            url = f'{link}?startAt={startAt}' if startAt > 0 else link
-            results = self.__makeRequest('GET', url)
-            logging.debug(f"Sprint Results: {results}")
+    def iterateBoards(self, workers=4):
+        """Yields every board visible to the user
+
+        Args:
+            workers: integer - the most pages to have in flight at once (defaults to 4)
+
+        Yields:
+            dictionary - A JSON encoded represenatation of each Jira board object
+        """
+        yield from self.__iteratePages(f"{self.__agile_url}board", workers=workers)
+
+    def __getPage(self, link, start_at, params=None):
+        """Gets a single page of a paginated Jira resource
+
+            Args:
+                link: string - URL of the paginated resource
+                start_at: integer - index of the first item on the page
+                params: dictionary - Any other request parameters to pass along (defaults to None)
 
+            Returns:
+                dictionary - the page of results, or False in the case of an error
+        """
+        page_params = dict(params or {})
+        if start_at > 0:
+            page_params['startAt'] = start_at
+
+        results = self.__makeRequest('GET', link, page_params or None)
+        logging.debug(f"Page Results ({link} @ {start_at}): {results}")
+        return results
+
+    def __iteratePages(self, link, params=None, workers=4, strict=False):
+        """Yields the items of a paginated Jira resource as pages arrive
+
+            We handle pagination by using `startAt`. When Jira tells us the `total` up front, the remaining pages are
+            fetched concurrently (at most `workers` at a time) and yielded in order, otherwise pages are walked one at a time.
+
+            Args:
+                link: string - URL of the paginated resource
+                params: dictionary - Any other request parameters to pass along (defaults to None)
+                workers: integer - the most pages to have in flight at once (defaults to 4)
+                strict: boolean - raise if a page can't be fetched, instead of stopping early (defaults to False)
+
+            Yields:
+                dictionary - each item in the resource's `values`
+        """
+        results = self.__getPage(link, 0, params)
+        if not results:
+            if strict:
+                self.__incompletePages(link, 0)
+            return
+
+        yield from results['values']
+        start_at = len(results['values'])
+
+        if results.get('total') is not None and workers > 1 and start_at > 0 and not results.get('isLast', True):
+            starts = iter(range(start_at, results['total'], start_at))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = deque((start, pool.submit(self.__getPage, link, start, params)) for start in islice(starts, workers))
+                while pending:
+                    start, future = pending.popleft()
+                    results = future.result()
+                    next_start = next(starts, None)
+                    if next_start is not None:
+                        pending.append((next_start, pool.submit(self.__getPage, link, next_start, params)))
+
+                    if not results:
+                        for _, future in pending:
+                            future.cancel()
+                        if strict:
+                            self.__incompletePages(link, start)
+                        return
+
+                    yield from results['values']
+                    start_at = start + len(results['values'])
+
+        # Anything past the advertised total (or everything, if there wasn't one) is walked sequentially
+        while results and results['values'] and not results.get('isLast', True):
+            results = self.__getPage(link, start_at, params)
             if results:
-                sprints.extend(results['values'])
-                startAt += len(results['values'])
+                yield from results['values']
+                start_at += len(results['values'])
+            elif strict:
+                self.__incompletePages(link, start_at)
 
-            if (not results) or (results.get('isLast', True)):
-                # break from while if results is false or `isLast` is True.
-                break
+    @staticmethod
+    def __incompletePages(link, start_at):
+        raise Error("I wasn't able to get everything I needed from Jira. This probably isn't your fault, please try again in a few minutes.", f"Failed to fetch page of {link} starting at {start_at}")
+
+    def iterateSprintsInBoard(self, board_id, workers=4, state=None):
+        """Yields the sprints in a board, oldest first, as pages arrive
+
+        Args:
+            board_id: string - the id of a Jira board
+            workers: integer - the most pages to have in flight at once (defaults to 4)
+            state: string - only sprints in these comma separated states, ie. 'closed' or 'active,future' (defaults to None, every sprint)
+
+        Yields:
+            dictionary - A JSON encoded represenatation of each Jira sprint object
+        """
+        yield from self.__iteratePages(f"{self.__agile_url}board/{board_id}/sprint", params={'state': state} if state else None, workers=workers)
+
+    def getSprintsInBoard(self, board_id):
+        # Because how sprints are returned (oldest first) we will reverse the list before return.
+        sprints = list(self.iterateSprintsInBoard(board_id))
 
         # if the 'sprints' array is empty it'll still return a falsy object
         # no need to explicitly return "false"
@@ -482,36 +1181,195 @@ class Jira:
         logging.debug(f"Sprints: {sprints}")
         return sprints
 
+    def getNewestSprintsInBoard(self, board_id, count, state=None):
+        """Gets the most recent sprints in a board without pulling its whole history
+
+        Sprints come back oldest first and the agile API doesn't tell us how many there are, so we gallop forward
+        to find the last page (a logarithmic number of requests) and then walk back just far enough to get `count` sprints.
+
+        Args:
+            board_id: string - the id of a Jira board
+            count: integer - how many sprints to return
+            state: string - only sprints in these comma separated states, ie. 'closed' (defaults to None, every sprint)
+
+        Returns:
+            list - up to `count` Jira sprint objects, newest first. Raises `Error` if a page can't be fetched
+        """
+        link = f"{self.__agile_url}board/{board_id}/sprint"
+        params = {'state': state} if state else None
+
+        results = self.__getPage(link, 0, params)
+        if not results:
+            self.__incompletePages(link, 0)
+
+        page_size = len(results['values'])
+        last_start = 0
+        # Keep every page we've probed so walking back doesn't ask for them again
+        pages = {0: results}
+        if page_size > 0 and not results.get('isLast', True):
+            # Gallop forward until we land on the last page or past the end. A probe that fails isn't the end of
+            # the board, taking it for one would quietly drop the newest sprints
+            probe = page_size
+            while True:
+                page = pages[probe] = self.__getPage(link, probe, params)
+                if not page:
+                    self.__incompletePages(link, probe)
+                if not page['values']:
+                    break
+
+                last_start, results = probe, page
+                if page.get('isLast', True):
+                    break
+                probe *= 2
+
+            # We overshot, binary search (by page) for the last page that still has sprints
+            low, high = last_start // page_size, probe // page_size
+            while not results.get('isLast', True) and high - low > 1:
+                middle = (low + high) // 2
+                page = pages[middle * page_size] = self.__getPage(link, middle * page_size, params)
+                if not page:
+                    self.__incompletePages(link, middle * page_size)
+                if page['values']:
+                    low, last_start, results = middle, middle * page_size, page
+                else:
+                    high = middle
+
+        sprints = list(reversed(results['values']))
+        while len(sprints) < count and last_start > 0:
+            last_start = max(0, last_start - page_size)
+            page = pages.get(last_start) or self.__getPage(link, last_start, params)
+            if not page:
+                self.__incompletePages(link, last_start)
+            sprints.extend(reversed(page['values']))
+
+        return sprints[:count]
+
+    def iterateFiltersWithJQL(self, workers=4, strict=False):
+        """Yields every filter, including its JQL, as pages arrive
+
+        Args:
+            workers: integer - the most pages to have in flight at once (defaults to 4)
+            strict: boolean - raise `Error` if a page can't be fetched, instead of stopping early (defaults to False)
+
+        Yields:
+            dictionary - A JSON encoded represenatation of each Jira filter
+        """
+        yield from self.__iteratePages(f"{self.__url}filter/search", params={'expand': 'jql'}, workers=workers, strict=strict)
+
     def getFiltersWithJQL(self):
-        link = f"{self.__url}filter/search?expand=jql"
-        filters = []
-        startAt = 0
+        return list(self.iterateFiltersWithJQL())
 
-        while True:
-            # Get list of sprints, if this is not the start, then start at `startAt`
-            url = f'{link}&startAt={startAt}' if startAt > 0 else link
-            results = self.__makeRequest('GET', url)
-            logging.debug(f"Filter Results: {results}")
+    @staticmethod
+    def compactIssue(issue):
+        """Flattens an issue from search into a small record
 
-            if results:
-                filters.extend(results['values'])
-                startAt += len(results['values'])
+        Nested objects are reduced to the one value people actually use (a status or issue type's `name`, an option's
+        `value`, a user's `displayName`), so `{"fields": {"status": {"name": "Done", ...}}}` becomes `{"status": "Done"}`.
+
+        Args:
+            issue: dictionary - a Jira issue as returned by search
 
-            if (not results) or (results.get('isLast', True)):
-                # break from while if results is false or `isLast` is True.
-                break
+        Returns:
+            dictionary - `key`, `id` and each returned field, plus `changelog` if it was expanded
+        """
+        def compact(value):
+            if isinstance(value, dict):
+                for name in ('name', 'value', 'key', 'displayName'):
+                    if name in value:
+                        return value[name]
+                return value
+            if isinstance(value, list):
+                return [compact(item) for item in value]
+            return value
+
+        record = {'key': issue['key'], 'id': issue.get('id')}
+        for field, value in (issue.get('fields') or {}).items():
+            record[field] = compact(value)
+        if 'changelog' in issue:
+            record['changelog'] = issue['changelog']
+
+        return record
+
+    def searchIssues(self, jql, fields=('summary', 'status', 'issuetype'), expand=None, page_size=100, compact=True, strict=False):
+        """Yields every issue matching a JQL query, in constant memory
+
+        Only the requested fields are asked for and nothing is expanded unless asked, which keeps payloads small.
+        While one page is being consumed the next is already being fetched, and at most those two pages are held.
 
-        return filters
+        Args:
+            jql: string - the JQL query
+            fields: list - the issue fields to return (defaults to summary, status and issue type)
+            expand: string - comma separated entities to expand, ie. 'changelog' (defaults to None)
+            page_size: integer - issues to ask for per request (defaults to 100)
+            compact: boolean - yield flattened records from `compactIssue` instead of raw issues (defaults to True)
+            strict: boolean - raise `Error` if a page can't be fetched, instead of stopping early (defaults to False)
+
+        Yields:
+            dictionary - each matching issue
+        """
+        params = {'jql': jql, 'maxResults': page_size, 'fields': ','.join(fields) if fields else '*none'}
+        if expand:
+            params['expand'] = expand
+
+        link = f"{self.__url}search"
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            start_at = 0
+            results = self.__makeRequest('GET', link, dict(params, startAt=start_at))
+            while True:
+                if not results:
+                    if strict:
+                        self.__incompletePages(link, start_at)
+                    return
+
+                start_at = results.get('startAt', start_at) + len(results['issues'])
+                more = results['issues'] and start_at < results.get('total', 0)
+                upcoming = pool.submit(self.__makeRequest, 'GET', link, dict(params, startAt=start_at)) if more else None
+
+                for issue in results['issues']:
+                    yield self.compactIssue(issue) if compact else issue
+
+                if upcoming is None:
+                    return
+                results = upcoming.result()
+
+    def getFilterIndex(self, max_age=300):
+        """Gets the local filter index, refreshing it if it's older than `max_age` seconds
 
-    def searchFiltersForJQL(self, jql):
-        filters = self.getFiltersWithJQL()
+        Args:
+            max_age: integer - how stale, in seconds, the index may be before it's refreshed (defaults to 300)
+
+        Returns:
+            filter_index.FilterIndex - an index over every filter's JQL
+        """
+        if self.__filter_index is None:
+            from filter_index import FilterIndex
 
-        for filter in filters:
+            self.__filter_index = FilterIndex(self)
+
+        if self.__filter_index.refreshed_at is None or time.time() - self.__filter_index.refreshed_at > max_age:
             try:
-                if re.search(jql, filter['jql']):
-                    print(f"Filter Link: {filter['self']}\nFilter JQL: {filter['jql']}\n------------")
-            except AttributeError:
-                logging.error(f"Filter does not have jql...\n{filter}")
+                counts = self.__filter_index.refresh()
+                logging.debug(f"Refreshed filter index: {counts}")
+            except Error as e:
+                # A complete but stale index beats a partial one, only give up if we've never had one
+                if self.__filter_index.refreshed_at is None:
+                    raise
+                logging.warning(f"Keeping the filter index from {self.__filter_index.refreshed_at}: {e.log_message}")
+
+        return self.__filter_index
+
+    def searchFiltersForJQL(self, jql, field=None, max_age=300):
+        """Finds filters whose JQL matches a regex
+
+        Args:
+            jql: string - regex to search each filter's JQL for
+            field: string - only consider filters referencing this field, ie. 'cf[10002]' (defaults to None)
+            max_age: integer - how stale, in seconds, the local filter index may be (defaults to 300)
+
+        Returns:
+            list - matching filters, each with its `id`, `name`, `self` link and `jql`
+        """
+        return self.getFilterIndex(max_age).search(jql, field=field)
 
 if __name__ == '__main__':
     jira_host = os.environ["JIRA_HOST"]
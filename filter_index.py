@@ -0,0 +1,243 @@
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+# Quoted strings, custom field references, words and the symbols JQL cares about
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|cf\[\d+\]|[\w.\-]+|!=|!~|>=|<=|[=~<>(),]', re.IGNORECASE)
+_OPERATORS = {'=', '!=', '~', '!~', '>', '>=', '<', '<=', 'in', 'is', 'was', 'changed', 'not'}
+# Includes the history predicates (`was in (...) during (...)`, `changed from ... to ... by ...`) so they aren't taken for functions
+_KEYWORDS = {'and', 'or', 'not', 'order', 'by', 'asc', 'desc', 'empty', 'null', 'during', 'before', 'after', 'on', 'from', 'to'}
+# Only these scope a query to a project, `project != ABC` and `project not in (ABC)` are the opposite
+_PROJECT_OPERATORS = (['='], ['in'])
+_CUSTOM_FIELD = re.compile(r'^(?:cf\[(\d+)\]|customfield_(\d+))$', re.IGNORECASE)
+
+def normalizeField(field):
+    """Normalizes a JQL field reference so `cf[10002]`, `customfield_10002` and `"Story Points"` style names compare equal
+
+    Args:
+        field: string - a field as written in JQL
+
+    Returns:
+        string - the lowercased field name, with custom fields as `customfield_<id>`
+    """
+    field = field.strip('"\'').lower()
+    match = _CUSTOM_FIELD.match(field)
+    if match:
+        return f"customfield_{match.group(1) or match.group(2)}"
+
+    return field
+
+def parseJQL(jql):
+    """Pulls the fields, projects and functions a JQL query references out of it
+
+    Projects are only the ones the query is scoped to (`project = ABC` or `project in (...)`), negated and history
+    clauses still count towards the `project` field but don't index their values.
+
+    Args:
+        jql: string - a JQL query
+
+    Returns:
+        dictionary - sets of 'field', 'project' and 'function' terms
+    """
+    terms = {'field': set(), 'project': set(), 'function': set()}
+    tokens = _TOKEN.findall(jql)
+    lowered = [token.lower() for token in tokens]
+
+    for index, token in enumerate(lowered):
+        if index + 1 < len(tokens) and tokens[index + 1] == '(' and token not in _OPERATORS and token not in _KEYWORDS and token[0] not in '"\'':
+            terms['function'].add(token)
+            continue
+
+        if token not in _OPERATORS or index == 0:
+            continue
+
+        previous = lowered[index - 1]
+        if previous in _OPERATORS or previous in _KEYWORDS or previous in '(),':
+            continue
+
+        field = normalizeField(tokens[index - 1])
+        terms['field'].add(field)
+
+        if field == 'project':
+            # Values follow the operator(s), either one value or a parenthesised list
+            position = index
+            while position < len(lowered) and lowered[position] in _OPERATORS:
+                position += 1
+
+            if lowered[index:position] not in _PROJECT_OPERATORS:
+                continue
+
+            if position < len(lowered) and tokens[position] == '(':
+                position += 1
+                while position < len(tokens) and tokens[position] != ')':
+                    if tokens[position] != ',' and (position + 1 >= len(tokens) or tokens[position + 1] != '('):
+                        terms['project'].add(tokens[position].strip('"\'').upper())
+                    position += 1
+            elif position < len(tokens) and (position + 1 >= len(tokens) or tokens[position + 1] != '('):
+                terms['project'].add(tokens[position].strip('"\'').upper())
+
+    # Fields that are only sorted on still count as referenced
+    if 'order' in lowered:
+        position = lowered.index('order') + 2
+        for token in tokens[position:]:
+            if token.lower() not in _KEYWORDS and token != ',':
+                terms['field'].add(normalizeField(token))
+
+    return terms
+
+class FilterIndex:
+    """Local, incrementally refreshed index over every filter's JQL
+
+    Keeps an inverted index from the fields, projects and functions each filter's JQL references to the filters, so
+    questions like "which filters reference custom field X" are dictionary lookups instead of a regex over every
+    filter. Refreshing re-parses only filters whose JQL changed and drops filters that no longer exist.
+    """
+
+    def __init__(self, jira=None):
+        """Creates an empty filter index
+
+            Args:
+                jira: custom_jira.Jira - client used to fetch filters on `refresh` (defaults to None, pass filters to `refresh` instead)
+        """
+        self.__jira = jira
+        self.__lock = threading.Lock()
+        self.__filters = {}
+        self.__terms = {}
+        self.__index = {'field': defaultdict(set), 'project': defaultdict(set), 'function': defaultdict(set)}
+        self.refreshed_at = None
+
+    def __len__(self):
+        return len(self.__filters)
+
+    def __unindex(self, filter_id):
+        for kind, values in self.__terms.pop(filter_id, {}).items():
+            for value in values:
+                self.__index[kind][value].discard(filter_id)
+                if not self.__index[kind][value]:
+                    del self.__index[kind][value]
+
+    def refresh(self, filters=None, complete=True):
+        """Brings the index up to date
+
+        Filters are fetched before the index is locked, so lookups keep being answered while Jira is paged through.
+
+            Args:
+                filters: iterable - filters (with `jql` expanded) to index, defaults to fetching them all from Jira
+                complete: boolean - whether `filters` is every filter, only then are filters missing from it dropped (defaults to True)
+
+            Returns:
+                dictionary - how many filters were added, updated and removed
+
+            Raises:
+                custom_jira.Error - if fetching the filters from Jira failed part way, the index is left as it was
+        """
+        if filters is None:
+            filters = self.__jira.iterateFiltersWithJQL(strict=True)
+        filters = list(filters)
+
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        seen = set()
+        with self.__lock:
+            for found in filters:
+                filter_id = found['id']
+                jql = found.get('jql')
+                if not isinstance(jql, str):
+                    logging.error(f"Filter does not have jql...\n{found}")
+                    continue
+
+                seen.add(filter_id)
+                existing = self.__filters.get(filter_id)
+                self.__filters[filter_id] = found
+                if existing is not None and existing.get('jql') == jql:
+                    continue
+
+                counts["updated" if existing is not None else "added"] += 1
+                self.__unindex(filter_id)
+                terms = parseJQL(jql)
+                self.__terms[filter_id] = terms
+                for kind, values in terms.items():
+                    for value in values:
+                        self.__index[kind][value].add(filter_id)
+
+            for filter_id in [filter_id for filter_id in self.__filters if complete and filter_id not in seen]:
+                self.__unindex(filter_id)
+                del self.__filters[filter_id]
+                counts["removed"] += 1
+
+            self.refreshed_at = time.time()
+
+        return counts
+
+    def __lookup(self, kind, value):
+        with self.__lock:
+            return [self.__filters[filter_id] for filter_id in sorted(self.__index[kind].get(value, ()))]
+
+    def findByField(self, field):
+        """Gets every filter that references a field
+
+            Args:
+                field: string - field name, ie. 'status', 'cf[10002]' or 'customfield_10002'
+
+            Returns:
+                list - matching filters
+        """
+        return self.__lookup('field', normalizeField(field))
+
+    def findByProject(self, project):
+        """Gets every filter that is scoped to a project
+
+            Args:
+                project: string - project key
+
+            Returns:
+                list - matching filters
+        """
+        return self.__lookup('project', project.upper())
+
+    def findByFunction(self, function):
+        """Gets every filter that calls a JQL function
+
+            Args:
+                function: string - function name, ie. 'openSprints'
+
+            Returns:
+                list - matching filters
+        """
+        return self.__lookup('function', function.lower())
+
+    def terms(self, kind):
+        """Gets every indexed term of a kind and how many filters use it
+
+            Args:
+                kind: string - 'field', 'project' or 'function'
+
+            Returns:
+                dictionary - term to number of filters referencing it
+        """
+        with self.__lock:
+            return {value: len(filter_ids) for value, filter_ids in self.__index[kind].items()}
+
+    def search(self, pattern, field=None, project=None, function=None):
+        """Finds filters whose JQL matches a regex, optionally narrowed down by the index first
+
+            Args:
+                pattern: string - regex to search each filter's JQL for
+                field: string - only consider filters referencing this field (defaults to None)
+                project: string - only consider filters scoped to this project (defaults to None)
+                function: string - only consider filters calling this function (defaults to None)
+
+            Returns:
+                list - matching filters
+        """
+        regex = re.compile(pattern)
+        with self.__lock:
+            candidates = None
+            for kind, value in (('field', field and normalizeField(field)), ('project', project and project.upper()), ('function', function and function.lower())):
+                if value is not None:
+                    filter_ids = self.__index[kind].get(value, set())
+                    candidates = filter_ids if candidates is None else candidates & filter_ids
+
+            filter_ids = self.__filters.keys() if candidates is None else candidates
+            return [self.__filters[filter_id] for filter_id in sorted(filter_ids) if regex.search(self.__filters[filter_id]['jql'])]
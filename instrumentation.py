@@ -0,0 +1,239 @@
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit, parse_qsl
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    # Upper bounds in seconds, anything slower lands in the overflow bucket
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        index = 0
+        while index < len(self.BUCKETS) and seconds > self.BUCKETS[index]:
+            index += 1
+
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Estimates a percentile as the upper bound of the bucket it falls in (capped at the slowest observation)"""
+        if self.count == 0:
+            return 0.0
+
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return min(self.BUCKETS[index], self.max) if index < len(self.BUCKETS) else self.max
+
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min or 0.0,
+            "max": self.max or 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "buckets": dict(zip([str(bound) for bound in self.BUCKETS] + ["+Inf"], self.counts))
+        }
+
+class Instrumentation:
+    """Collects per-endpoint request metrics and timings of the client's own work
+
+    Requests are grouped by endpoint template (ids replaced with `{id}`, query values dropped), recording a latency
+    histogram, bytes received, status codes, retries and cache outcomes for each. Named timers record time spent in
+    higher-level methods such as `calculateSprintMetrics`. Every event is also passed to any registered hooks, so it
+    can be forwarded to another metrics system.
+    """
+
+    __id = re.compile(r'/\d+(?=/|$)')
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__hooks = []
+        self.reset()
+
+    def reset(self):
+        """Forgets everything collected so far"""
+        with self.__lock:
+            self.__requests = {}
+            self.__timers = {}
+
+    def addHook(self, hook):
+        """Registers a callable that's given every event as a dictionary
+
+            Args:
+                hook: callable - called with the event, exceptions it raises are logged and ignored
+        """
+        self.__hooks.append(hook)
+
+    def removeHook(self, hook):
+        """Unregisters a hook added with `addHook`"""
+        self.__hooks.remove(hook)
+
+    def __emit(self, event):
+        for hook in list(self.__hooks):
+            try:
+                hook(event)
+            except Exception as e:
+                logging.error(f"Instrumentation hook {hook} failed: {e}")
+
+    @classmethod
+    def endpointTemplate(cls, verb, url, params=None):
+        """Reduces a request to the endpoint it hits
+
+            Args:
+                verb: string - HTTP verb
+                url: string - request URL, including any query string
+                params: dictionary - request parameters (defaults to None)
+
+            Returns:
+                string - ie. 'GET /rest/agile/latest/board/{id}/sprint?startAt'
+        """
+        parts = urlsplit(url)
+        path = cls.__id.sub('/{id}', re.sub(r'/+', '/', parts.path))
+        names = sorted({name for name, _ in parse_qsl(parts.query)} | set(params or {}))
+        return f"{verb} {path}" + (f"?{'&'.join(names)}" if names else "")
+
+    def __endpoint(self, template):
+        endpoint = self.__requests.get(template)
+        if endpoint is None:
+            endpoint = self.__requests[template] = {
+                "latency": Histogram(),
+                "bytes": 0,
+                "statuses": {},
+                "retries": 0,
+                "cache": {"hit": 0, "miss": 0, "revalidated": 0}
+            }
+
+        return endpoint
+
+    def recordRequest(self, verb, url, params, status, elapsed, size=None, cache=None):
+        """Records a finished request
+
+            Args:
+                verb: string - HTTP verb
+                url: string - request URL
+                params: dictionary - request parameters
+                status: integer - final HTTP status, None if Jira couldn't be reached
+                elapsed: float - seconds spent, including retries
+                size: integer - response body bytes received (defaults to None)
+                cache: string - 'hit', 'miss' or 'revalidated' when a cache is in use (defaults to None)
+        """
+        template = self.endpointTemplate(verb, url, params)
+        with self.__lock:
+            endpoint = self.__endpoint(template)
+            if cache:
+                endpoint["cache"][cache] += 1
+            # Cache hits never reached Jira, counting them as near instant requests would drag the percentiles down
+            if cache != 'hit':
+                endpoint["latency"].add(elapsed)
+                endpoint["bytes"] += size or 0
+                endpoint["statuses"][str(status)] = endpoint["statuses"].get(str(status), 0) + 1
+
+        self.__emit({"type": "request", "endpoint": template, "status": status, "elapsed": elapsed, "bytes": size, "cache": cache})
+
+    def recordRetry(self, verb, url, params, status):
+        """Records a retried attempt
+
+            Args:
+                verb: string - HTTP verb
+                url: string - request URL
+                params: dictionary - request parameters
+                status: integer - the status that caused the retry, None for connection errors
+        """
+        template = self.endpointTemplate(verb, url, params)
+        with self.__lock:
+            self.__endpoint(template)["retries"] += 1
+
+        self.__emit({"type": "retry", "endpoint": template, "status": status})
+
+    def recordTime(self, name, elapsed):
+        """Records time spent in a named piece of work
+
+            Args:
+                name: string - what was timed, ie. 'calculateSprintMetrics'
+                elapsed: float - seconds spent
+        """
+        with self.__lock:
+            timer = self.__timers.get(name)
+            if timer is None:
+                timer = self.__timers[name] = Histogram()
+            timer.add(elapsed)
+
+        self.__emit({"type": "timer", "name": name, "elapsed": elapsed})
+
+    @contextmanager
+    def timer(self, name):
+        """Context manager that records the time spent inside it under `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.recordTime(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Gets everything collected so far
+
+            Returns:
+                dictionary - 'requests' keyed by endpoint template and 'timers' keyed by name, with latency histograms
+                summarised (count, mean, min, max, p50, p90, p99 and bucket counts)
+        """
+        with self.__lock:
+            requests = {}
+            for template, endpoint in self.__requests.items():
+                lookups = endpoint["cache"]["hit"] + endpoint["cache"]["miss"] + endpoint["cache"]["revalidated"]
+                requests[template] = {
+                    "latency": endpoint["latency"].snapshot(),
+                    "bytes": endpoint["bytes"],
+                    "statuses": dict(endpoint["statuses"]),
+                    "retries": endpoint["retries"],
+                    "cache": dict(endpoint["cache"], hit_rate=endpoint["cache"]["hit"] / lookups if lookups else 0.0)
+                }
+
+            timers = {name: timer.snapshot() for name, timer in self.__timers.items()}
+
+        return {"requests": requests, "timers": timers}
+
+    def export(self, path):
+        """Writes a snapshot out as JSON
+
+            Args:
+                path: string - file to write to
+        """
+        with open(path, 'w') as out:
+            json.dump(self.snapshot(), out, indent=4, sort_keys=True)
+
+def timed(method):
+    """Decorator for client methods, recording their duration when the client has instrumentation"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return method(self, *args, **kwargs)
+
+        with instrumentation.timer(method.__name__):
+            return method(self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,325 @@
+import math
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+def _timestamp(value):
+    """Converts a Jira date (ie. '2021-03-01T10:15:30.000+0000' or '2021-03-01T09:00:00.000Z') to epoch seconds"""
+    if not value:
+        return None
+
+    value = value.replace('Z', '+0000')
+    for pattern in ('%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%dT%H:%M:%S%z'):
+        try:
+            return datetime.strptime(value, pattern).timestamp()
+        except ValueError:
+            pass
+
+    return None
+
+def _number(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def _sprintIds(value):
+    """Parses the comma separated sprint ids Jira puts in sprint changelog entries"""
+    return {sprint_id.strip() for sprint_id in (value or '').split(',') if sprint_id.strip()}
+
+def _parseSprint(value):
+    """Normalizes a sprint field value, which is a dictionary on Jira Cloud and a `Sprint@...[id=1,...]` string on server"""
+    if isinstance(value, str):
+        value = dict(re.findall(r'(\w+)=([^,\]]*)', value))
+        value['boardId'] = value.get('rapidViewId')
+
+    return {
+        "id": str(value.get('id')),
+        "board_id": str(value.get('boardId')) if value.get('boardId') not in (None, '<null>') else None,
+        "name": value.get('name'),
+        "state": (value.get('state') or '').lower(),
+        "goal": value.get('goal') if value.get('goal') != '<null>' else None,
+        "start": _timestamp(value.get('startDate')),
+        "end": _timestamp(value.get('endDate')),
+        "complete": _timestamp(value.get('completeDate'))
+    }
+
+class IssueSync:
+    """Incrementally syncs issues into a local SQLite store and recomputes sprint metrics from it
+
+    The first `sync` of a scope pulls every issue in it, later syncs only ask Jira for issues updated since the
+    previous one started (using a relative `updated >= -Nm` clause, so the Jira user's timezone doesn't matter). For
+    each issue we keep its type, status, estimate, sprint membership and the sprint / estimate history from its
+    changelog, which is enough to rebuild a greenhopper-style sprint report locally and hand it to
+    `Jira.calculateSprintMetrics`. Jira only returns the most recent 100 changelog entries through search, so issues
+    with very long histories may lose their oldest sprint moves.
+    """
+
+    __schema = """
+        CREATE TABLE IF NOT EXISTS issues (
+            key TEXT PRIMARY KEY,
+            type_name TEXT,
+            status_category TEXT,
+            estimate REAL,
+            created REAL,
+            resolved REAL,
+            updated REAL
+        );
+        CREATE TABLE IF NOT EXISTS issue_sprints (
+            key TEXT NOT NULL,
+            sprint_id TEXT NOT NULL,
+            PRIMARY KEY (key, sprint_id)
+        );
+        CREATE INDEX IF NOT EXISTS issue_sprints_by_sprint ON issue_sprints (sprint_id);
+        CREATE TABLE IF NOT EXISTS sprint_events (
+            key TEXT NOT NULL,
+            sprint_id TEXT NOT NULL,
+            action TEXT NOT NULL,
+            at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sprint_events_by_sprint ON sprint_events (sprint_id);
+        CREATE INDEX IF NOT EXISTS sprint_events_by_key ON sprint_events (key);
+        CREATE TABLE IF NOT EXISTS estimate_changes (
+            key TEXT NOT NULL,
+            at REAL NOT NULL,
+            from_value REAL,
+            to_value REAL
+        );
+        CREATE INDEX IF NOT EXISTS estimate_changes_by_key ON estimate_changes (key);
+        CREATE TABLE IF NOT EXISTS sprints (
+            sprint_id TEXT PRIMARY KEY,
+            board_id TEXT,
+            name TEXT,
+            state TEXT,
+            goal TEXT,
+            start REAL,
+            end REAL,
+            complete REAL
+        );
+        CREATE TABLE IF NOT EXISTS sync_state (
+            scope TEXT PRIMARY KEY,
+            started REAL NOT NULL
+        );
+    """
+
+    def __init__(self, jira, path='issues.db', estimate_field='customfield_10002', sprint_field='customfield_10020'):
+        """Opens (or creates) a local issue store
+
+            Args:
+                jira: custom_jira.Jira - the client to sync with
+                path: string - the SQLite database file to use, or ':memory:' (defaults to 'issues.db')
+                estimate_field: string - the field boards estimate with, ie. story points (defaults to 'customfield_10002')
+                sprint_field: string - the field Jira keeps sprints in (defaults to 'customfield_10020')
+        """
+        self.__jira = jira
+        self.__estimate_field = estimate_field
+        self.__sprint_field = sprint_field
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        with self.__lock, self.__db:
+            self.__db.executescript(self.__schema)
+
+    def lastSync(self, scope):
+        """Gets when the last sync of a scope started
+
+            Args:
+                scope: string - the JQL scope that was synced
+
+            Returns:
+                float - epoch seconds, or None if the scope has never been synced
+        """
+        with self.__lock:
+            row = self.__db.execute("SELECT started FROM sync_state WHERE scope = ?", (scope,)).fetchone()
+
+        return row[0] if row else None
+
+    def sync(self, scope, overlap=300):
+        """Pulls every issue in `scope` that changed since the last sync into the local store
+
+            Args:
+                scope: string - JQL selecting the issues to keep, ie. 'project in (ABC, XYZ)'
+                overlap: integer - extra seconds to look back, to cover clock skew between us and Jira (defaults to 300)
+
+            Returns:
+                dictionary - 'issues' synced and the set of 'sprints' whose metrics may have changed
+
+            Raises:
+                custom_jira.Error - if a page of issues couldn't be fetched, the next sync starts from the same place
+        """
+        started = time.time()
+        last = self.lastSync(scope)
+
+        jql = f"({scope})"
+        if last is not None:
+            minutes = math.ceil((started - last + overlap) / 60)
+            jql += f" AND updated >= -{minutes}m"
+        # Paging goes by `startAt`, so order by something edits can't change. Ordered by `updated`, an issue edited
+        # mid-sync jumps to the end and shifts the rest back a place, skipping whichever sat on a page boundary
+        jql += " ORDER BY created ASC, key ASC"
+
+        fields = ['issuetype', 'status', 'resolutiondate', 'created', 'updated', self.__estimate_field, self.__sprint_field]
+        synced = 0
+        sprints = set()
+        for issue in self.__jira.searchIssues(jql, fields=fields, expand='changelog', compact=False, strict=True):
+            sprints |= self.__store(issue)
+            synced += 1
+
+        # Only reached after a complete pass, a failed page raises above and leaves the watermark where it was
+        with self.__lock, self.__db:
+            self.__db.execute("INSERT OR REPLACE INTO sync_state (scope, started) VALUES (?, ?)", (scope, started))
+
+        return {"issues": synced, "sprints": sprints}
+
+    def __store(self, issue):
+        key = issue['key']
+        fields = issue['fields']
+
+        sprints = [_parseSprint(value) for value in fields.get(self.__sprint_field) or []]
+        events = []
+        estimates = []
+        for history in (issue.get('changelog') or {}).get('histories', []):
+            at = _timestamp(history.get('created'))
+            for item in history.get('items', []):
+                if item.get('fieldId') == self.__sprint_field or item.get('field') == 'Sprint':
+                    before, after = _sprintIds(item.get('from')), _sprintIds(item.get('to'))
+                    events.extend((key, sprint_id, 'added', at) for sprint_id in after - before)
+                    events.extend((key, sprint_id, 'removed', at) for sprint_id in before - after)
+                elif item.get('fieldId') == self.__estimate_field:
+                    estimates.append((key, at, _number(item.get('fromString')), _number(item.get('toString'))))
+
+        status = fields.get('status') or {}
+        with self.__lock, self.__db:
+            self.__db.execute(
+                "INSERT OR REPLACE INTO issues (key, type_name, status_category, estimate, created, resolved, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, (fields.get('issuetype') or {}).get('name'), (status.get('statusCategory') or {}).get('key'),
+                 _number(fields.get(self.__estimate_field)), _timestamp(fields.get('created')),
+                 _timestamp(fields.get('resolutiondate')), _timestamp(fields.get('updated')))
+            )
+
+            # Whatever sprints the issue touched before this sync may need their metrics recalculated too
+            touched = {row[0] for row in self.__db.execute("SELECT sprint_id FROM issue_sprints WHERE key = ? UNION SELECT sprint_id FROM sprint_events WHERE key = ?", (key, key))}
+
+            for table in ('issue_sprints', 'sprint_events', 'estimate_changes'):
+                self.__db.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+
+            self.__db.executemany("INSERT INTO issue_sprints (key, sprint_id) VALUES (?, ?)", [(key, sprint["id"]) for sprint in sprints])
+            self.__db.executemany("INSERT INTO sprint_events (key, sprint_id, action, at) VALUES (?, ?, ?, ?)", events)
+            self.__db.executemany("INSERT INTO estimate_changes (key, at, from_value, to_value) VALUES (?, ?, ?, ?)", estimates)
+            self.__db.executemany(
+                """INSERT INTO sprints (sprint_id, board_id, name, state, goal, start, end, complete) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (sprint_id) DO UPDATE SET board_id = COALESCE(excluded.board_id, board_id), name = excluded.name,
+                   state = excluded.state, goal = excluded.goal, start = excluded.start, end = excluded.end, complete = excluded.complete""",
+                [(sprint["id"], sprint["board_id"], sprint["name"], sprint["state"], sprint["goal"], sprint["start"], sprint["end"], sprint["complete"]) for sprint in sprints]
+            )
+
+        return touched | {sprint["id"] for sprint in sprints} | {event[1] for event in events}
+
+    def __estimateAt(self, issue, changes, at):
+        """Works out an issue's estimate at a point in time from its estimate history"""
+        if at is None or not changes:
+            return issue["estimate"]
+
+        # Before its first change the issue had the value that change moved it from
+        value = changes[0][1]
+        for change_at, _, to_value in changes:
+            if change_at > at:
+                break
+            value = to_value
+
+        return value
+
+    def buildSprintReport(self, sprint_id):
+        """Rebuilds a greenhopper-style sprint report for a sprint from the local store
+
+            Args:
+                sprint_id: string - the id of a Jira sprint
+
+            Returns:
+                dictionary - a sprint report with the same shape `Jira.calculateSprintMetrics` expects, or None if the sprint isn't known
+        """
+        sprint_id = str(sprint_id)
+        with self.__lock:
+            sprint = self.__db.execute("SELECT name, state, goal, start, end, complete FROM sprints WHERE sprint_id = ?", (sprint_id,)).fetchone()
+            if sprint is None:
+                return None
+
+            name, state, goal, start, end, complete = sprint
+            # Issues in the sprint now, or that were ever moved in or out of it. Joined as a subquery rather than bound
+            # one key per parameter, which runs into SQLite's variable limit on large sprints
+            sprint_keys = "SELECT key FROM issue_sprints WHERE sprint_id = ? UNION SELECT key FROM sprint_events WHERE sprint_id = ?"
+            issues = {}
+            for row in self.__db.execute(f"SELECT key, type_name, status_category, estimate, created, resolved FROM issues WHERE key IN ({sprint_keys})", (sprint_id, sprint_id)):
+                issues[row[0]] = dict(zip(("key", "type_name", "status_category", "estimate", "created", "resolved"), row))
+
+            members = {row[0] for row in self.__db.execute("SELECT key FROM issue_sprints WHERE sprint_id = ?", (sprint_id,))}
+            events = {}
+            for key, action, at in self.__db.execute("SELECT key, action, at FROM sprint_events WHERE sprint_id = ? ORDER BY at", (sprint_id,)):
+                events.setdefault(key, []).append((action, at))
+            changes = {}
+            for key, at, from_value, to_value in self.__db.execute(f"SELECT key, at, from_value, to_value FROM estimate_changes WHERE key IN ({sprint_keys}) ORDER BY at", (sprint_id, sprint_id)):
+                changes.setdefault(key, []).append((at, from_value, to_value))
+
+        closed_at = complete if state == 'closed' else None
+        contents = {
+            "completedIssues": [],
+            "issuesNotCompletedInCurrentSprint": [],
+            "puntedIssues": [],
+            "issueKeysAddedDuringSprint": {}
+        }
+
+        for key in sorted(issues):
+            issue = issues[key]
+            history = events.get(key, [])
+            added = [at for action, at in history if action == 'added']
+            joined = added[0] if added else issue["created"]
+
+            # Issues taken out of the sprint before it started were never part of it
+            if key not in members and history and history[-1][0] == 'removed' and (start is None or history[-1][1] <= start):
+                continue
+
+            if start is not None and joined is not None and joined > start:
+                contents["issueKeysAddedDuringSprint"][key] = True
+
+            item_changes = changes.get(key, [])
+            original = self.__estimateAt(issue, item_changes, max(start or 0, joined or 0) or None)
+            current = self.__estimateAt(issue, item_changes, closed_at)
+            report_issue = {
+                "key": key,
+                "typeName": issue["type_name"],
+                "estimateStatistic": {"statFieldValue": {"value": original} if original is not None else {}},
+                "currentEstimateStatistic": {"statFieldValue": {"value": current} if current is not None else {}}
+            }
+
+            if key not in members and history and history[-1][0] == 'removed':
+                contents["puntedIssues"].append(report_issue)
+            elif issue["status_category"] == 'done' and (closed_at is None or issue["resolved"] is None or issue["resolved"] <= closed_at):
+                contents["completedIssues"].append(report_issue)
+            else:
+                contents["issuesNotCompletedInCurrentSprint"].append(report_issue)
+
+        return {
+            "sprint": {"id": int(sprint_id) if sprint_id.isdigit() else sprint_id, "name": name, "state": state.upper(), "goal": goal},
+            "contents": contents
+        }
+
+    def calculateSprintMetrics(self, sprint_id):
+        """Calculates a sprint's metrics from the local store, without asking Jira
+
+            Args:
+                sprint_id: string - the id of a Jira sprint
+
+            Returns:
+                dictionary - metrics as `Jira.calculateSprintMetrics` returns them, or None if the sprint isn't known
+        """
+        sprint_report = self.buildSprintReport(sprint_id)
+        if sprint_report is None:
+            return None
+
+        return self.__jira.calculateSprintMetrics(sprint_report)
+
+    def close(self):
+        """Closes the underlying database"""
+        with self.__lock:
+            self.__db.close()
@@ -0,0 +1,183 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache:
+    """Size-bounded, in-memory LRU cache for Jira GET responses
+
+    Each endpoint gets its own time-to-live, matched by regex against the request URL. Once an entry expires it is
+    kept around so it can be revalidated with `If-None-Match` / `If-Modified-Since`; a 304 from Jira refreshes the
+    entry without downloading the body again. Cached responses are shared between callers, so treat them as read-only.
+    """
+
+    # Board metadata barely ever changes, sprints and reports move while a sprint is active
+    DEFAULT_TTLS = [
+        (r'/rest/agile/latest/board/\d+$', 3600),
+        (r'/rest/agile/latest/sprint/\d+$', 60),
+        (r'/rest/greenhopper/latest/rapid/charts/velocity\b', 300),
+        (r'/rest/greenhopper/latest/rapid/charts/sprintreport\b', 60)
+    ]
+
+    def __init__(self, max_entries=1024, ttls=None, default_ttl=0):
+        """Creates a response cache
+
+            Args:
+                max_entries: integer - the most responses to hold before evicting the least recently used (defaults to 1024)
+                ttls: list - (regex, seconds) pairs giving the time-to-live for matching URLs, first match wins (defaults to DEFAULT_TTLS)
+                default_ttl: integer - time-to-live in seconds for URLs that don't match any pattern (defaults to 0)
+        """
+        self.__max_entries = max_entries
+        self.__ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls if ttls is not None else self.DEFAULT_TTLS)]
+        self.__default_ttl = default_ttl
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__stats = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+
+    @staticmethod
+    def __key(url, params):
+        return (url, tuple(sorted(params.items())) if params else ())
+
+    def ttlFor(self, url):
+        """Gets the time-to-live for a URL
+
+            Args:
+                url: string - the request URL
+
+            Returns:
+                integer - seconds a response for this URL stays fresh
+        """
+        for pattern, ttl in self.__ttls:
+            if pattern.search(url):
+                return ttl
+
+        return self.__default_ttl
+
+    def lookup(self, url, params=None):
+        """Looks up a cached response
+
+            Args:
+                url: string - the request URL
+                params: dictionary - the request parameters (defaults to None)
+
+            Returns:
+                tuple - (data, headers) where `data` is the cached response if it's still fresh (otherwise None) and
+                `headers` are the conditional request headers to revalidate a stale entry with
+        """
+        key = self.__key(url, params)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                # URLs that are never kept without a validator (ie. searches) aren't misses, they were never cacheable
+                if self.ttlFor(url) > 0:
+                    self.__stats["misses"] += 1
+                return None, {}
+
+            self.__entries.move_to_end(key)
+            if entry["expires"] > time.monotonic():
+                self.__stats["hits"] += 1
+                return entry["data"], {}
+
+            self.__stats["misses"] += 1
+            headers = {}
+            if entry["etag"]:
+                headers['If-None-Match'] = entry["etag"]
+            if entry["last_modified"]:
+                headers['If-Modified-Since'] = entry["last_modified"]
+
+            return None, headers
+
+    def revalidated(self, url, params=None):
+        """Marks a stale entry as fresh again after Jira answered a conditional request with 304
+
+            Args:
+                url: string - the request URL
+                params: dictionary - the request parameters (defaults to None)
+
+            Returns:
+                dictionary - the cached response, or None if it was evicted in the meantime
+        """
+        key = self.__key(url, params)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+
+            entry["expires"] = time.monotonic() + self.ttlFor(url)
+            self.__entries.move_to_end(key)
+            self.__stats["revalidated"] += 1
+            return entry["data"]
+
+    def store(self, url, params, data, headers):
+        """Stores a response
+
+            Responses for URLs with no time-to-live are only kept if Jira gave us a validator to revalidate them with.
+
+            Args:
+                url: string - the request URL
+                params: dictionary - the request parameters
+                data: dictionary - the decoded response
+                headers: dictionary - the response headers
+        """
+        ttl = self.ttlFor(url)
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if ttl <= 0 and not (etag or last_modified):
+            return
+
+        key = self.__key(url, params)
+        with self.__lock:
+            self.__entries[key] = {
+                "data": data,
+                "expires": time.monotonic() + ttl,
+                "etag": etag,
+                "last_modified": last_modified
+            }
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_entries:
+                self.__entries.popitem(last=False)
+                self.__stats["evictions"] += 1
+
+    def invalidate(self, url, params=None):
+        """Drops a single cached response
+
+            Args:
+                url: string - the request URL
+                params: dictionary - the request parameters (defaults to None)
+        """
+        with self.__lock:
+            self.__entries.pop(self.__key(url, params), None)
+
+    def invalidateMatching(self, pattern):
+        """Drops every cached response whose URL matches a regex
+
+            Args:
+                pattern: string - regex to search request URLs for (ie. 'rapidViewId=42')
+
+            Returns:
+                integer - the number of entries dropped
+        """
+        regex = re.compile(pattern)
+        with self.__lock:
+            keys = [key for key in self.__entries if regex.search(key[0])]
+            for key in keys:
+                del self.__entries[key]
+
+        return len(keys)
+
+    def clear(self):
+        """Drops every cached response"""
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        """Gets cache counters
+
+            Returns:
+                dictionary - hits, misses, revalidations, evictions and the current number of entries
+        """
+        with self.__lock:
+            return dict(self.__stats, entries=len(self.__entries))
+
+    def __len__(self):
+        return len(self.__entries)
@@ -0,0 +1,92 @@
+"""Command line access to sprint metrics, sprint reports, velocity and filter search
+
+Meant for cron jobs and one-off serverless runs, where start-up is a big share of the runtime. Only `argparse` and
+`json` are imported up front. The client is imported once the arguments are parsed, and `requests` is only imported
+once Jira is actually called, so answers coming out of a `--store` never load it.
+
+    pipenv run python jira_cli.py metrics 1234 --store sprint_reports.db
+    pipenv run python jira_cli.py report 1234
+    pipenv run python jira_cli.py velocity 56 --sprints 5
+    pipenv run python jira_cli.py filters "status = Done" --field status
+"""
+import argparse
+import json
+import os
+import sys
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(description='Sprint metrics, reports, velocity and filter search from Jira')
+    parser.add_argument('--store', help='SQLite sprint store to answer closed sprints from (and save them to)')
+    parser.add_argument('--host', default=os.environ.get('JIRA_HOST'), help='Jira host (defaults to $JIRA_HOST)')
+    parser.add_argument('--user', default=os.environ.get('JIRA_USER'), help='Jira user (defaults to $JIRA_USER)')
+    parser.add_argument('--token', default=os.environ.get('JIRA_TOKEN'), help='Jira API token (defaults to $JIRA_TOKEN)')
+    parser.add_argument('--scheme', default='https', help="URL scheme to talk to Jira with, only worth changing for a local stand-in server (defaults to 'https')")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    metrics = commands.add_parser('metrics', help='issue metrics for a sprint')
+    metrics.add_argument('sprint_id')
+
+    report = commands.add_parser('report', help='full sprint report data and its Google Form URL')
+    report.add_argument('sprint_id')
+
+    velocity = commands.add_parser('velocity', help='rolling average velocity as of every sprint on a board')
+    velocity.add_argument('board_id')
+    velocity.add_argument('--sprints', type=int, default=3, help='how many sprints to average over')
+
+    filters = commands.add_parser('filters', help="filters whose JQL matches a regex")
+    filters.add_argument('jql', help="regex to search each filter's JQL for, ie. 'cf\\[10002\\]'")
+    filters.add_argument('--field', help="only consider filters referencing this field, ie. 'cf[10002]'")
+
+    args = parser.parse_args(argv)
+    if not (args.host and args.user and args.token):
+        parser.error('a Jira host, user and token are needed (--host/--user/--token or JIRA_HOST/JIRA_USER/JIRA_TOKEN)')
+
+    return args
+
+def run(args):
+    """Runs a parsed command
+
+        Args:
+            args: argparse.Namespace - as returned by `parseArgs`
+
+        Returns:
+            object - the JSON serializable result
+    """
+    from custom_jira import Jira
+
+    store = None
+    if args.store:
+        from sprint_store import SprintReportStore
+        store = SprintReportStore(args.store)
+
+    jira = Jira(args.host, args.user, args.token, store=store, scheme=args.scheme)
+
+    if args.command == 'metrics':
+        sprint = jira.getSprint(args.sprint_id)
+        return jira.getSprintMetrics(args.sprint_id, sprint['originBoardId'])
+
+    if args.command == 'report':
+        report, url = jira.getSprintReportForm(args.sprint_id)
+        return dict(report, form_url=url)
+
+    if args.command == 'velocity':
+        return jira.getRollingVelocity(args.board_id, args.sprints)
+
+    return jira.searchFiltersForJQL(args.jql, args.field)
+
+def main(argv=None):
+    args = parseArgs(argv)
+
+    from custom_jira import Error
+    try:
+        result = run(args)
+    except Error as e:
+        print(e.message, file=sys.stderr)
+        return 1
+
+    json.dump(result, sys.stdout, indent=4)
+    sys.stdout.write("\n")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import argparse
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from custom_jira import Error, Jira, SprintDataError
+from sprint_store import SprintReportStore
+
+class PrecomputeScheduler:
+    """Builds sprint reports ahead of time, as soon as sprints close
+
+    Polls boards for closed sprints that don't have materialized report data yet, and builds their report data,
+    metrics and Google Form URL into the client's `SprintReportStore`. Later commands for those sprints
+    (`getSprintReportForm`, `generateAllSprintReportData`, `getSprintMetricsCommand`) are answered from the store
+    without calling Jira, so the end-of-sprint rush doesn't wait on the API.
+
+    Polls only look at each board's most recently closed sprints, `warmUp` goes through their whole history. Sprints
+    that fail because Jira was unavailable are tried again on the next poll, only sprints whose own data can't be
+    turned into a report (ie. a name without a sprint number) are skipped from then on.
+    """
+
+    def __init__(self, jira, boards=None, interval=300, workers=4, recent=10):
+        """Creates a scheduler
+
+            Args:
+                jira: Jira - a client with a `SprintReportStore`
+                boards: list - board ids to watch (defaults to None, in which case every board is watched)
+                interval: float - seconds between polls when running in the background (defaults to 300)
+                workers: integer - how many sprints to build at once (defaults to 4)
+                recent: integer - how many of each board's newest closed sprints a poll checks (defaults to 10)
+        """
+        if jira.store is None:
+            raise ValueError("PrecomputeScheduler needs a Jira client with a SprintReportStore")
+
+        self.__jira = jira
+        self.__boards = [str(board_id) for board_id in boards] if boards else None
+        self.__interval = interval
+        self.__workers = workers
+        self.__recent = recent
+        self.__failed = set()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def boards(self):
+        """Gets the ids of the boards being watched
+
+            Returns:
+                list - board ids (as strings)
+        """
+        if self.__boards is not None:
+            return list(self.__boards)
+
+        return [str(board['id']) for board in self.__jira.iterateBoards()]
+
+    def findClosedSprints(self, board_id, recent=None):
+        """Finds the closed sprints on a board that haven't been materialized yet
+
+            Args:
+                board_id: string - the id of a Jira board
+                recent: integer - only check this many of the newest closed sprints (defaults to None, every closed sprint)
+
+            Returns:
+                list - sprint ids (as strings)
+        """
+        board_id = str(board_id)
+        materialized = self.__jira.store.materializedSprintIds(board_id)
+
+        if recent:
+            sprints = reversed(self.__jira.getNewestSprintsInBoard(board_id, recent, state='closed'))
+        else:
+            sprints = self.__jira.iterateSprintsInBoard(board_id, state='closed')
+
+        sprint_ids = []
+        for sprint in sprints:
+            sprint_id = str(sprint['id'])
+            # Sprints can show up on several boards, only build them for the board they came from
+            if (self.__jira.store.isClosed(sprint) and str(sprint.get('originBoardId', board_id)) == board_id
+                    and sprint_id not in materialized and sprint_id not in self.__failed):
+                sprint_ids.append(sprint_id)
+
+        return sprint_ids
+
+    def __materialize(self, sprint_id):
+        try:
+            self.__jira.getSprintReportForm(sprint_id)
+            return True
+        except SprintDataError as e:
+            # These won't fix themselves (ie. a sprint name without a number), so don't try them again every poll
+            logging.error(f"Unable to precompute sprint {sprint_id}, skipping it from now on: {e.log_message or e.message}")
+            self.__failed.add(sprint_id)
+        except Error as e:
+            # Most likely Jira throttling us or being down, the next poll tries again
+            logging.warning(f"Unable to precompute sprint {sprint_id}, will retry: {e.log_message or e.message}")
+        except Exception:
+            logging.exception(f"Unable to precompute sprint {sprint_id}")
+
+        return False
+
+    def __build(self, boards, recent):
+        sprint_ids = []
+        for board_id in boards:
+            try:
+                sprint_ids.extend(self.findClosedSprints(board_id, recent))
+            except Error as e:
+                logging.warning(f"Unable to list sprints on board {board_id}, will retry: {e.log_message or e.message}")
+
+        if not sprint_ids:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.__workers) as pool:
+            built = list(pool.map(self.__materialize, sprint_ids))
+
+        materialized = [sprint_id for sprint_id, ok in zip(sprint_ids, built) if ok]
+        logging.info(f"Precomputed {len(materialized)} of {len(sprint_ids)} closed sprints")
+        return materialized
+
+    def poll(self, boards=None):
+        """Builds every newly closed sprint once, checking only the `recent` newest closed sprints of each board
+
+            Args:
+                boards: list - board ids to check (defaults to None, in which case every watched board is checked)
+
+            Returns:
+                list - ids of the sprints that were materialized
+        """
+        return self.__build(boards or self.boards(), self.__recent)
+
+    def warmUp(self):
+        """Builds every closed sprint on every board that isn't materialized yet, ie. when starting with an empty store
+
+            Returns:
+                list - ids of the sprints that were materialized
+        """
+        return self.__build([str(board['id']) for board in self.__jira.iterateBoards()], None)
+
+    def start(self):
+        """Starts polling on a background thread"""
+        if self.__thread is not None:
+            return
+
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, name='precompute-scheduler', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stops polling, waiting for the current poll to finish"""
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __run(self):
+        while not self.__stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logging.exception("Precompute poll failed")
+            self.__stop.wait(self.__interval)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Materialize sprint reports for closed sprints ahead of time')
+    parser.add_argument('--boards', nargs='*', help='board ids to watch (defaults to every board)')
+    parser.add_argument('--store', default='sprint_reports.db', help='SQLite sprint store to fill')
+    parser.add_argument('--interval', type=float, default=300, help='seconds between polls')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--recent', type=int, default=10, help="how many of each board's newest closed sprints a poll checks")
+    parser.add_argument('--warm-up', action='store_true', help='build every closed sprint on every board once and exit')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    jira = Jira(os.environ['JIRA_HOST'], os.environ['JIRA_USER'], os.environ['JIRA_TOKEN'], store=SprintReportStore(args.store))
+    scheduler = PrecomputeScheduler(jira, args.boards, args.interval, args.workers, args.recent)
+
+    if args.warm_up:
+        print(f"Materialized {len(scheduler.warmUp())} sprints")
+    else:
+        scheduler.start()
+        try:
+            while True:
+                threading.Event().wait(3600)
+        except KeyboardInterrupt:
+            scheduler.stop()
@@ -0,0 +1,47 @@
+import threading
+import time
+
+class RateLimiter:
+    """Thread-safe token bucket
+
+    Tokens refill continuously at `rate` per second up to `burst`. Every request takes one token, waiting for the
+    bucket to refill when it's empty, so any number of threads sharing one limiter stay under a single quota.
+    """
+
+    def __init__(self, rate, burst=None):
+        """Creates a token bucket
+
+            Args:
+                rate: float - sustained requests per second allowed
+                burst: integer - the most requests allowed back to back after a quiet period (defaults to `rate`)
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self.__tokens = self.burst
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Takes tokens from the bucket, waiting until they're available
+
+            Args:
+                tokens: integer - how many tokens to take (defaults to 1)
+
+            Returns:
+                float - the number of seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(self.burst, self.__tokens + (now - self.__updated) * self.rate)
+                self.__updated = now
+
+                if self.__tokens >= tokens:
+                    self.__tokens -= tokens
+                    return waited
+
+                delay = (tokens - self.__tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
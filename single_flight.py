@@ -0,0 +1,60 @@
+import threading
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one
+
+    The first caller for a key runs the work; anyone asking for the same key while it's still running waits for that
+    result (or exception) instead of repeating the work. Once the call finishes the key is forgotten, so later calls
+    run again.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__calls = {}
+
+    def do(self, key, function, *args, **kwargs):
+        """Runs `function(*args, **kwargs)` unless a call for `key` is already in flight
+
+            Args:
+                key: hashable - identifies identical calls
+                function: callable - the work to do
+
+            Returns:
+                tuple - (result, shared) where shared is True if this caller got another call's result
+        """
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.__calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def inFlight(self):
+        """Gets how many distinct calls are currently running"""
+        with self.__lock:
+            return len(self.__calls)
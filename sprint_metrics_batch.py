@@ -0,0 +1,204 @@
+import logging
+
+import numpy as np
+
+from custom_jira import Jira
+
+# Outcome codes for the `outcome` column
+COMPLETED = 0
+NOT_COMPLETED = 1
+REMOVED = 2
+
+def _estimate(issue, field):
+    try:
+        return int(issue[field]["statFieldValue"]["value"])
+    except Exception:
+        return 0
+
+class SprintMetricsBatch:
+    """Columnar engine for calculating the metrics of many sprints at once
+
+    Issues from every sprint report added are flattened into NumPy columns (sprint index, outcome, issue type code,
+    original / current estimate and whether the issue was planned), and `calculate` produces the same
+    `points` / `items` / `issue_keys` / `meta` metrics as `Jira.calculateSprintMetrics` for all sprints with
+    grouped reductions instead of per-issue Python loops.
+    """
+
+    def __init__(self, sprint_reports=None):
+        """Creates a batch, optionally loading some sprint reports into it
+
+            Args:
+                sprint_reports: iterable - raw Jira sprint reports to load (defaults to None)
+        """
+        self.__sprint = []
+        self.__outcome = []
+        self.__type = []
+        self.__original = []
+        self.__current = []
+        self.__planned = []
+        self.__issue_keys = []
+        self.__type_codes = {}
+
+        if sprint_reports is not None:
+            self.extend(sprint_reports)
+
+    def __len__(self):
+        return len(self.__issue_keys)
+
+    def add(self, sprint_report):
+        """Loads a single sprint report's issues into the batch
+
+            Args:
+                sprint_report: dictionary - the data from a Jira sprint report
+
+            Returns:
+                integer - the index of this sprint in the results of `calculate`
+        """
+        index = len(self.__issue_keys)
+        contents = sprint_report["contents"]
+        added = contents["issueKeysAddedDuringSprint"]
+        ignore = Jira.IGNORED_TYPES
+
+        issue_keys = {
+            "committed": [],
+            "completed": [],
+            "incomplete": [],
+            "removed": []
+        }
+
+        for outcome, issues, key_list in (
+            (COMPLETED, contents["completedIssues"], issue_keys["completed"]),
+            (NOT_COMPLETED, contents["issuesNotCompletedInCurrentSprint"], issue_keys["incomplete"]),
+            (REMOVED, contents["puntedIssues"], issue_keys["removed"])
+        ):
+            for issue in issues:
+                key = issue["key"]
+                key_list.append(key)
+
+                type_name = issue["typeName"]
+                if type_name in ignore:
+                    continue
+
+                planned = key not in added
+                if planned:
+                    issue_keys["committed"].append(key)
+
+                self.__sprint.append(index)
+                self.__outcome.append(outcome)
+                self.__type.append(self.__type_codes.setdefault(type_name, len(self.__type_codes)))
+                self.__original.append(_estimate(issue, "estimateStatistic") if outcome == COMPLETED else 0)
+                self.__current.append(_estimate(issue, "currentEstimateStatistic"))
+                self.__planned.append(planned)
+
+        self.__issue_keys.append(issue_keys)
+        return index
+
+    def extend(self, sprint_reports):
+        """Loads many sprint reports into the batch
+
+            Args:
+                sprint_reports: iterable - raw Jira sprint reports
+        """
+        for sprint_report in sprint_reports:
+            self.add(sprint_report)
+
+    def calculate(self):
+        """Calculates metrics for every sprint in the batch
+
+            Returns:
+                list - one dictionary per sprint, in the order they were added, identical to what
+                `Jira.calculateSprintMetrics` returns for that sprint report
+        """
+        count = len(self.__issue_keys)
+        sprint = np.array(self.__sprint, dtype=np.intp)
+        outcome = np.array(self.__outcome, dtype=np.int8)
+        type_code = np.array(self.__type, dtype=np.intp)
+        original = np.array(self.__original, dtype=np.int64)
+        current = np.array(self.__current, dtype=np.int64)
+        planned = np.array(self.__planned, dtype=bool)
+        unplanned = ~planned
+
+        type_names = sorted(self.__type_codes, key=self.__type_codes.get)
+
+        def is_type(types):
+            return np.array([name in types for name in type_names], dtype=bool)[type_code]
+
+        story = is_type(["Story"])
+        feature = is_type(Jira.FEATURE_WORK_TYPES)
+        optimization = is_type(Jira.OPTIMIZATION_TYPES)
+        bug = is_type(Jira.BUG_TYPES)
+
+        completed = outcome == COMPLETED
+        not_completed = outcome == NOT_COMPLETED
+        removed = outcome == REMOVED
+
+        def total(mask, weights=None):
+            if weights is None:
+                return np.bincount(sprint[mask], minlength=count).astype(np.int64)
+            return np.bincount(sprint[mask], weights=weights[mask], minlength=count).astype(np.int64)
+
+        planned_completed = completed & planned
+        grown = planned_completed & (original < current)
+
+        points = {
+            "committed": total(planned_completed, original) + total((not_completed | removed) & planned, current),
+            "completed": total(completed, current),
+            "planned_completed": total(planned_completed, current),
+            "unplanned_completed": total(completed & unplanned, current) + total(grown, current - original),
+            "feature_completed": total(completed & feature, current),
+            "optimization_completed": total(completed & optimization, current),
+            "not_completed": total(not_completed, current),
+            "removed": total(removed, current)
+        }
+
+        items = {
+            "committed": total(planned),
+            "completed": total(completed),
+            "planned_completed": total(planned_completed),
+            "unplanned_completed": total(completed & unplanned),
+            "stories_completed": total(completed & story),
+            "unplanned_stories_completed": total(completed & story & unplanned),
+            "bugs_completed": total(completed & bug),
+            "unplanned_bugs_completed": total(completed & bug & unplanned),
+            "not_completed": total(not_completed),
+            "removed": total(removed)
+        }
+
+        committed = points["committed"]
+        has_commitments = committed != 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            predictability = np.where(has_commitments, np.trunc(points["completed"] / committed * 100), 0).astype(np.int64)
+            predictability_of_commitments = np.where(has_commitments, np.trunc(points["planned_completed"] / committed * 100), 0).astype(np.int64)
+
+        if not has_commitments.all():
+            # If a sprint has no points committed, we say the predictability is 0
+            logging.warning(f'{count - int(has_commitments.sum())} of {count} sprints had no commitments, their predictability is 0')
+
+        points = {name: column.tolist() for name, column in points.items()}
+        items = {name: column.tolist() for name, column in items.items()}
+        predictability = predictability.tolist()
+        predictability_of_commitments = predictability_of_commitments.tolist()
+
+        return [
+            {
+                "points": {name: column[index] for name, column in points.items()},
+                "items": {name: column[index] for name, column in items.items()},
+                "issue_keys": self.__issue_keys[index],
+                "meta": {
+                    "predictability": predictability[index],
+                    "predictability_of_commitments": predictability_of_commitments[index]
+                }
+            }
+            for index in range(count)
+        ]
+
+def calculateSprintMetricsBatch(sprint_reports):
+    """Calculates metrics for many sprint reports at once
+
+    Args:
+        sprint_reports: iterable - raw Jira sprint reports
+
+    Returns:
+        list - calculated metrics for each sprint report, in order, identical to `Jira.calculateSprintMetrics`
+    """
+    return SprintMetricsBatch(sprint_reports).calculate()
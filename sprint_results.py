@@ -0,0 +1,213 @@
+import json
+import sys
+from array import array
+from collections.abc import Mapping
+
+# Fixed counter layouts, in the same order `Jira.calculateSprintMetrics` builds them
+POINTS_FIELDS = ("committed", "completed", "planned_completed", "unplanned_completed", "feature_completed", "optimization_completed", "not_completed", "removed")
+ITEMS_FIELDS = ("committed", "completed", "planned_completed", "unplanned_completed", "stories_completed", "unplanned_stories_completed", "bugs_completed", "unplanned_bugs_completed", "not_completed", "removed")
+META_FIELDS = ("predictability", "predictability_of_commitments")
+ISSUE_KEY_FIELDS = ("committed", "completed", "incomplete", "removed")
+
+REPORT_FIELDS = ("sprint_number", "sprint_start", "sprint_end", "sprint_goals", "issue_metrics", "project_name", "project_key", "average_velocity")
+
+# Separators for the packed issue key blob, neither can appear in an issue key
+_KEY_SEPARATOR = '\x1f'
+_LIST_SEPARATOR = '\x1e'
+
+# Serialized counters are always little-endian, so they can move between machines
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+class CounterView(Mapping):
+    """Read-only dictionary view over a fixed-layout slice of counters"""
+    __slots__ = ('_names', '_counters', '_offset')
+
+    def __init__(self, names, counters, offset):
+        self._names = names
+        self._counters = counters
+        self._offset = offset
+
+    def __getitem__(self, name):
+        try:
+            return self._counters[self._offset + self._names.index(name)]
+        except ValueError:
+            raise KeyError(name)
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class SprintMetrics(Mapping):
+    """Compact form of the metrics `Jira.calculateSprintMetrics` returns
+
+    All counters live in one `array('q')` with a fixed layout and issue keys are interned and kept in tuples, so
+    years of sprint history take a fraction of the memory of the nested dictionaries. It reads like the original
+    dictionary (`metrics['points']['completed']`), and `toDict` gives back exactly the original.
+    """
+    __slots__ = ('_counters', '_issue_keys')
+
+    def __init__(self, counters, issue_keys):
+        """Creates metrics from their packed parts, use `fromDict` or `fromBytes` instead
+
+            Args:
+                counters: array - points, items and meta counters laid out as `POINTS_FIELDS`, `ITEMS_FIELDS` and `META_FIELDS`
+                issue_keys: tuple - a tuple of issue keys for each of `ISSUE_KEY_FIELDS`
+        """
+        self._counters = counters
+        self._issue_keys = issue_keys
+
+    @classmethod
+    def fromDict(cls, metrics):
+        """Packs metrics as returned by `Jira.calculateSprintMetrics`
+
+            Args:
+                metrics: dictionary - calculated metrics
+
+            Returns:
+                SprintMetrics - the packed metrics
+        """
+        counters = array('q', [metrics["points"][name] for name in POINTS_FIELDS])
+        counters.extend(metrics["items"][name] for name in ITEMS_FIELDS)
+        counters.extend(metrics["meta"][name] for name in META_FIELDS)
+        issue_keys = tuple(tuple(sys.intern(key) for key in metrics["issue_keys"][name]) for name in ISSUE_KEY_FIELDS)
+        return cls(counters, issue_keys)
+
+    def __getitem__(self, name):
+        if name == "points":
+            return CounterView(POINTS_FIELDS, self._counters, 0)
+        if name == "items":
+            return CounterView(ITEMS_FIELDS, self._counters, len(POINTS_FIELDS))
+        if name == "meta":
+            return CounterView(META_FIELDS, self._counters, len(POINTS_FIELDS) + len(ITEMS_FIELDS))
+        if name == "issue_keys":
+            return dict(zip(ISSUE_KEY_FIELDS, self._issue_keys))
+        raise KeyError(name)
+
+    def __iter__(self):
+        return iter(("points", "items", "issue_keys", "meta"))
+
+    def __len__(self):
+        return 4
+
+    def __repr__(self):
+        return f"SprintMetrics({self.toDict()!r})"
+
+    def toDict(self):
+        """Gets the metrics as the plain nested dictionary `Jira.calculateSprintMetrics` returns"""
+        return {
+            "points": dict(self["points"]),
+            "items": dict(self["items"]),
+            "issue_keys": {name: list(keys) for name, keys in zip(ISSUE_KEY_FIELDS, self._issue_keys)},
+            "meta": dict(self["meta"])
+        }
+
+    def toBytes(self):
+        """Serializes the metrics: the counters as little-endian 64 bit integers followed by the UTF-8 issue keys"""
+        counters = self._counters
+        if _BIG_ENDIAN:
+            counters = array('q', counters)
+            counters.byteswap()
+
+        keys = _LIST_SEPARATOR.join(_KEY_SEPARATOR.join(keys) for keys in self._issue_keys)
+        return counters.tobytes() + keys.encode()
+
+    @classmethod
+    def fromBytes(cls, data):
+        """Deserializes metrics written by `toBytes`"""
+        size = (len(POINTS_FIELDS) + len(ITEMS_FIELDS) + len(META_FIELDS)) * array('q').itemsize
+        counters = array('q')
+        counters.frombytes(data[:size])
+        if _BIG_ENDIAN:
+            counters.byteswap()
+        issue_keys = tuple(
+            tuple(sys.intern(key) for key in keys.split(_KEY_SEPARATOR)) if keys else ()
+            for keys in data[size:].decode().split(_LIST_SEPARATOR)
+        )
+        return cls(counters, issue_keys)
+
+class SprintReportData(Mapping):
+    """Compact form of the report data `Jira.generateAllSprintReportData` returns
+
+    Reads like the original dictionary, so it can be handed straight to `Jira.generateGoogleFormURL`. Fields the
+    original didn't have (ie. sprints without start / end dates) are missing here too, and any extra fields (ie. the
+    `board_id` and `sprint_id` `BatchReportRunner` adds) are kept as they are.
+    """
+    __slots__ = REPORT_FIELDS + ('_extras',)
+
+    @classmethod
+    def fromDict(cls, report):
+        """Packs report data as returned by `Jira.generateAllSprintReportData`
+
+            Args:
+                report: dictionary - AgileOps Sprint Report data
+
+            Returns:
+                SprintReportData - the packed report data
+        """
+        packed = cls()
+        packed._extras = None
+        for name, value in report.items():
+            if name not in REPORT_FIELDS:
+                if packed._extras is None:
+                    packed._extras = {}
+                packed._extras[name] = value
+                continue
+
+            if name == "issue_metrics" and not isinstance(value, SprintMetrics):
+                value = SprintMetrics.fromDict(value)
+            elif name == "sprint_goals":
+                value = tuple(value)
+            elif isinstance(value, str):
+                value = sys.intern(value)
+            setattr(packed, name, value)
+
+        return packed
+
+    def __getitem__(self, name):
+        if name not in REPORT_FIELDS:
+            if self._extras is not None and name in self._extras:
+                return self._extras[name]
+            raise KeyError(name)
+
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __iter__(self):
+        yield from (name for name in REPORT_FIELDS if hasattr(self, name))
+        if self._extras is not None:
+            yield from self._extras
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"SprintReportData({self.toDict()!r})"
+
+    def toDict(self):
+        """Gets the report data as the plain dictionary `Jira.generateAllSprintReportData` returns"""
+        report = {}
+        for name in self:
+            value = self[name]
+            if name == "issue_metrics":
+                value = value.toDict()
+            elif name == "sprint_goals":
+                value = list(value)
+            report[name] = value
+
+        return report
+
+    def toJSON(self):
+        """Serializes the report data as JSON"""
+        return json.dumps(self.toDict())
+
+    @classmethod
+    def fromJSON(cls, data):
+        """Deserializes report data written by `toJSON`"""
+        return cls.fromDict(json.loads(data))
@@ -0,0 +1,194 @@
+import json
+import sqlite3
+import threading
+import time
+
+class SprintReportStore:
+    """Persistent SQLite store for closed sprints
+
+    Once a sprint is closed its sprint object, greenhopper sprint report and calculated metrics never change, so
+    they're kept on disk keyed by `(board_id, sprint_id)` and served from there instead of asking Jira again.
+    The store survives restarts, so a fresh process can answer historical queries without any network calls.
+    """
+
+    __schema = """
+        CREATE TABLE IF NOT EXISTS sprints (
+            board_id TEXT NOT NULL,
+            sprint_id TEXT NOT NULL,
+            sprint TEXT,
+            report TEXT,
+            metrics TEXT,
+            report_data TEXT,
+            form_url TEXT,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (board_id, sprint_id)
+        );
+        CREATE INDEX IF NOT EXISTS sprints_by_sprint_id ON sprints (sprint_id);
+    """
+
+    def __init__(self, path='sprint_reports.db'):
+        """Opens (or creates) a sprint report store
+
+            Args:
+                path: string - the SQLite database file to use, or ':memory:' (defaults to 'sprint_reports.db')
+        """
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        with self.__lock, self.__db:
+            self.__db.executescript(self.__schema)
+            # Stores created before report data was materialized are missing its columns
+            columns = {row[1] for row in self.__db.execute("PRAGMA table_info(sprints)")}
+            for column in ('report_data', 'form_url'):
+                if column not in columns:
+                    self.__db.execute(f"ALTER TABLE sprints ADD COLUMN {column} TEXT")
+
+    @staticmethod
+    def isClosed(sprint):
+        """Checks whether a sprint is closed
+
+            Args:
+                sprint: dictionary - an agile sprint object or the `sprint` section of a greenhopper sprint report
+
+            Returns:
+                boolean - True if the sprint is closed and its data won't change anymore
+        """
+        return str(sprint.get('state', '')).lower() == 'closed'
+
+    def __get(self, column, where, args):
+        with self.__lock:
+            row = self.__db.execute(f"SELECT {column} FROM sprints WHERE {where} AND {column} IS NOT NULL", args).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def __save(self, board_id, sprint_id, column, value):
+        with self.__lock, self.__db:
+            self.__db.execute(
+                f"""INSERT INTO sprints (board_id, sprint_id, {column}, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (board_id, sprint_id) DO UPDATE SET {column} = excluded.{column}, updated_at = excluded.updated_at""",
+                (str(board_id), str(sprint_id), json.dumps(value), time.time())
+            )
+
+    def getSprint(self, sprint_id):
+        """Gets a stored sprint object
+
+            Args:
+                sprint_id: string - the id of a Jira sprint
+
+            Returns:
+                dictionary - the agile sprint object, or None if it isn't stored
+        """
+        return self.__get('sprint', 'sprint_id = ?', (str(sprint_id),))
+
+    def getReport(self, board_id, sprint_id):
+        """Gets a stored greenhopper sprint report
+
+            Args:
+                board_id: string - the id of a Jira board
+                sprint_id: string - the id of a Jira sprint
+
+            Returns:
+                dictionary - the raw sprint report, or None if it isn't stored
+        """
+        return self.__get('report', 'board_id = ? AND sprint_id = ?', (str(board_id), str(sprint_id)))
+
+    def getMetrics(self, board_id, sprint_id):
+        """Gets stored sprint metrics
+
+            Args:
+                board_id: string - the id of a Jira board
+                sprint_id: string - the id of a Jira sprint
+
+            Returns:
+                dictionary - metrics as calculated by `Jira.calculateSprintMetrics`, or None if they aren't stored
+        """
+        return self.__get('metrics', 'board_id = ? AND sprint_id = ?', (str(board_id), str(sprint_id)))
+
+    def getReportData(self, sprint_id):
+        """Gets materialized report data and its Google Form URL
+
+            Args:
+                sprint_id: string - the id of a Jira sprint
+
+            Returns:
+                tuple - (report_data, form_url) as built by `Jira.generateAllSprintReportData` and
+                        `Jira.generateGoogleFormURL`, or None if they aren't stored
+        """
+        with self.__lock:
+            row = self.__db.execute(
+                "SELECT report_data, form_url FROM sprints WHERE sprint_id = ? AND report_data IS NOT NULL", (str(sprint_id),)
+            ).fetchone()
+
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def materializedSprintIds(self, board_id):
+        """Gets the sprints on a board that already have materialized report data
+
+            Args:
+                board_id: string - the id of a Jira board
+
+            Returns:
+                set - sprint ids (as strings)
+        """
+        with self.__lock:
+            rows = self.__db.execute("SELECT sprint_id FROM sprints WHERE board_id = ? AND report_data IS NOT NULL", (str(board_id),)).fetchall()
+
+        return {row[0] for row in rows}
+
+    def saveSprint(self, sprint):
+        """Stores an agile sprint object under its origin board
+
+            Args:
+                sprint: dictionary - the agile sprint object
+        """
+        self.__save(sprint['originBoardId'], sprint['id'], 'sprint', sprint)
+
+    def saveReport(self, board_id, sprint_id, report):
+        """Stores a raw greenhopper sprint report
+
+            Args:
+                board_id: string - the id of a Jira board
+                sprint_id: string - the id of a Jira sprint
+                report: dictionary - the raw sprint report
+        """
+        self.__save(board_id, sprint_id, 'report', report)
+
+    def saveMetrics(self, board_id, sprint_id, metrics):
+        """Stores calculated sprint metrics
+
+            Args:
+                board_id: string - the id of a Jira board
+                sprint_id: string - the id of a Jira sprint
+                metrics: dictionary - metrics as calculated by `Jira.calculateSprintMetrics`
+        """
+        self.__save(board_id, sprint_id, 'metrics', metrics)
+
+    def saveReportData(self, board_id, sprint_id, report_data, form_url):
+        """Stores materialized report data and its Google Form URL
+
+            Args:
+                board_id: string - the id of a Jira board
+                sprint_id: string - the id of a Jira sprint
+                report_data: dictionary - report data as built by `Jira.generateAllSprintReportData`
+                form_url: string - the URL built by `Jira.generateGoogleFormURL`
+        """
+        with self.__lock, self.__db:
+            self.__db.execute(
+                """INSERT INTO sprints (board_id, sprint_id, report_data, form_url, updated_at) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (board_id, sprint_id) DO UPDATE SET report_data = excluded.report_data, form_url = excluded.form_url, updated_at = excluded.updated_at""",
+                (str(board_id), str(sprint_id), json.dumps(report_data), form_url, time.time())
+            )
+
+    def delete(self, board_id, sprint_id):
+        """Drops everything stored for a sprint
+
+            Args:
+                board_id: string - the id of a Jira board
+                sprint_id: string - the id of a Jira sprint
+        """
+        with self.__lock, self.__db:
+            self.__db.execute("DELETE FROM sprints WHERE board_id = ? AND sprint_id = ?", (str(board_id), str(sprint_id)))
+
+    def close(self):
+        """Closes the underlying database"""
+        with self.__lock:
+            self.__db.close()
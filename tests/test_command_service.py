@@ -0,0 +1,137 @@
+import threading
+import time
+import unittest
+
+from command_service import CommandService
+from custom_jira import Error
+
+class GatedJira:
+    """Stands in for `Jira`, holding every command until `gate` is set so the workers can be kept busy"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.answered = []
+
+    def getSprintMetricsCommand(self, message):
+        self.started.release()
+        self.gate.wait(5)
+        sprint_id = message.split()[-1]
+        if sprint_id == '13':
+            raise Error("No sprint 13 here")
+        self.answered.append(sprint_id)
+        return {'text': f"metrics for {sprint_id}"}
+
+    def getSprintReportForm(self, sprint_id):
+        self.started.release()
+        self.gate.wait(5)
+        self.answered.append(sprint_id)
+        return {'project_key': 'ABC', 'sprint_number': sprint_id}, f"https://forms/{sprint_id}"
+
+class CommandServiceTest(unittest.TestCase):
+
+    def service(self, **kwargs):
+        self.jira = GatedJira()
+        service = CommandService(self.jira, **dict({'workers': 1}, **kwargs))
+        service.start()
+        self.addCleanup(service.stop)
+        self.addCleanup(self.jira.gate.set)
+        return service
+
+    def busy(self, service, user='alice'):
+        """Gives the only worker a command to sit on"""
+        future = service.submit(user, 'sprint metrics 1')
+        self.assertTrue(self.jira.started.acquire(timeout=5))
+        return future
+
+    def test_answers_commands(self):
+        service = self.service()
+        self.jira.gate.set()
+
+        self.assertEqual(service.handle('alice', 'sprint metrics 5'), {'text': "metrics for 5"})
+        self.assertEqual(service.handle('alice', 'sprint report 6'), {'text': "Here's the sprint report for ABC sprint 6: https://forms/6"})
+        self.assertEqual(service.handle('alice', 'sprint metrics 13'), {'text': "No sprint 13 here"})
+        self.assertEqual(service.handle('alice', 'how are you?'), CommandService.UNKNOWN)
+        self.assertEqual(service.stats, {'accepted': 3, 'rejected': 0, 'expired': 0, 'failed': 0, 'completed': 3, 'queued': 0})
+
+    def test_rejects_when_queue_is_full(self):
+        service = self.service(queue_size=1)
+        self.busy(service)
+
+        queued = service.submit('bob', 'sprint metrics 2')
+        rejected = service.submit('carol', 'sprint metrics 3')
+
+        self.assertEqual(rejected.result(0), CommandService.BUSY)
+        self.jira.gate.set()
+        self.assertEqual(queued.result(5), {'text': "metrics for 2"})
+        self.assertEqual(service.stats['rejected'], 1)
+
+    def test_rejects_when_user_has_too_many_queued(self):
+        service = self.service(queue_size=4, per_user=1)
+        self.busy(service)
+
+        service.submit('alice', 'sprint metrics 2')
+        self.assertEqual(service.submit('alice', 'sprint metrics 3').result(0), CommandService.USER_BUSY)
+        self.assertFalse(service.submit('bob', 'sprint metrics 4').done())
+
+    def test_round_robin_across_users(self):
+        service = self.service()
+        self.busy(service)
+
+        futures = [service.submit(user, f'sprint metrics {sprint_id}') for user, sprint_id in (('alice', 2), ('alice', 3), ('alice', 4), ('bob', 5))]
+        self.jira.gate.set()
+        for future in futures:
+            future.result(5)
+
+        self.assertEqual(self.jira.answered, ['1', '2', '5', '3', '4'])
+
+    def test_expired_before_start(self):
+        service = self.service()
+        self.busy(service)
+
+        future = service.submit('bob', 'sprint metrics 2', deadline=0.01)
+        time.sleep(0.05)
+        self.jira.gate.set()
+
+        self.assertEqual(future.result(5), CommandService.TIMEOUT)
+        self.assertNotIn('2', self.jira.answered)
+        self.assertEqual(service.stats['expired'], 1)
+
+    def test_cancelled_job_frees_its_slot(self):
+        service = self.service(queue_size=1, per_user=1)
+        self.busy(service)
+
+        queued = service.submit('bob', 'sprint metrics 2')
+        self.assertEqual(service.stats['queued'], 1)
+        self.assertTrue(queued.cancel())
+
+        self.assertEqual(service.stats['queued'], 0)
+        replacement = service.submit('bob', 'sprint metrics 3')
+        self.assertFalse(replacement.done())
+        self.jira.gate.set()
+        self.assertEqual(replacement.result(5), {'text': "metrics for 3"})
+        self.assertNotIn('2', self.jira.answered)
+
+    def test_handle_times_out_and_dequeues(self):
+        service = self.service()
+        self.busy(service)
+
+        self.assertEqual(service.handle('bob', 'sprint metrics 2', deadline=0.05), CommandService.TIMEOUT)
+        self.assertEqual(service.stats['queued'], 0)
+
+    def test_stop_cancels_queued_jobs(self):
+        service = self.service()
+        running = self.busy(service)
+        queued = [service.submit(user, 'sprint metrics 2') for user in ('alice', 'bob')]
+
+        service.stop(wait=False)
+
+        self.assertTrue(all(future.cancelled() for future in queued))
+        self.assertEqual(service.stats['queued'], 0)
+        self.assertEqual(service.submit('carol', 'sprint metrics 3').result(0), CommandService.BUSY)
+        self.jira.gate.set()
+        self.assertEqual(running.result(5), {'text': "metrics for 1"})
+        self.assertEqual(self.jira.answered, ['1'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from filter_index import FilterIndex, parseJQL
+
+FILTERS = [
+    {"id": "1", "name": "ABC sprint", "jql": "project = ABC AND sprint in openSprints()"},
+    {"id": "2", "name": "Everyone but ABC", "jql": "project != ABC AND cf[10002] is not EMPTY"},
+    {"id": "3", "name": "Not ABC or DEF", "jql": "project not in (ABC, DEF) ORDER BY customfield_10002 DESC"},
+    {"id": "4", "name": "ABC and DEF", "jql": "project in (abc, \"DEF\") AND assignee = currentUser()"},
+    {"id": "5", "name": "Stuck", "jql": "status was in (\"In Progress\", Blocked) during (\"2020/01/01\", now())"}
+]
+
+class ParseJQLTest(unittest.TestCase):
+
+    def test_fields_projects_and_functions(self):
+        terms = parseJQL("project = ABC AND cf[10002] > 3 AND sprint in openSprints() ORDER BY Rank ASC, created")
+
+        self.assertEqual(terms["field"], {"project", "customfield_10002", "sprint", "rank", "created"})
+        self.assertEqual(terms["project"], {"ABC"})
+        self.assertEqual(terms["function"], {"opensprints"})
+
+    def test_project_lists(self):
+        self.assertEqual(parseJQL("project in (abc, 'DEF', \"Ghi\")")["project"], {"ABC", "DEF", "GHI"})
+        self.assertEqual(parseJQL("project in projectsWhereUserHasRole(Developers)")["project"], set())
+
+    def test_negated_projects_are_not_indexed(self):
+        for jql in ("project != ABC", "project not in (ABC, DEF)", "project was ABC", "project is not EMPTY"):
+            with self.subTest(jql=jql):
+                terms = parseJQL(jql)
+                self.assertEqual(terms["project"], set())
+                self.assertEqual(terms["field"], {"project"})
+
+    def test_history_keywords_are_not_functions(self):
+        terms = parseJQL("status was in (\"In Progress\", Blocked) during (\"2020/01/01\", now()) AND "
+                         "assignee changed from jsmith to (bob) by currentUser() after startOfWeek() before (\"2020/02/01\") on (\"2020/01/15\")")
+
+        self.assertEqual(terms["function"], {"now", "currentuser", "startofweek"})
+        self.assertEqual(terms["field"], {"status", "assignee"})
+
+class FilterIndexTest(unittest.TestCase):
+
+    def index(self, filters=FILTERS):
+        index = FilterIndex()
+        index.refresh(filters)
+        return index
+
+    @staticmethod
+    def ids(filters):
+        return [found["id"] for found in filters]
+
+    def test_find_by_project_skips_excluding_filters(self):
+        index = self.index()
+
+        self.assertEqual(self.ids(index.findByProject("abc")), ["1", "4"])
+        self.assertEqual(self.ids(index.findByProject("DEF")), ["4"])
+        self.assertEqual(self.ids(index.findByField("project")), ["1", "2", "3", "4"])
+
+    def test_find_by_field_and_function(self):
+        index = self.index()
+
+        self.assertEqual(self.ids(index.findByField("cf[10002]")), ["2", "3"])
+        self.assertEqual(self.ids(index.findByFunction("now")), ["5"])
+        self.assertEqual(index.findByFunction("during"), [])
+
+    def test_search_narrows_with_index(self):
+        self.assertEqual(self.ids(self.index().search(r"EMPTY|DESC", field="customfield_10002")), ["2", "3"])
+        self.assertEqual(self.ids(self.index().search(r"(?i)abc", project="ABC")), ["1", "4"])
+
+    def test_refresh_updates_and_removes(self):
+        index = self.index()
+        counts = index.refresh([dict(FILTERS[0], jql="project = XYZ"), FILTERS[1]])
+
+        self.assertEqual(counts, {"added": 0, "updated": 1, "removed": 3})
+        self.assertEqual(self.ids(index.findByProject("XYZ")), ["1"])
+        self.assertEqual(index.findByProject("ABC"), [])
+        self.assertEqual(len(index), 2)
+
+if __name__ == '__main__':
+    unittest.main()
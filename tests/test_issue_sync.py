@@ -0,0 +1,168 @@
+import sqlite3
+import unittest
+
+from custom_jira import Error, Jira
+from issue_sync import IssueSync
+
+ESTIMATE_FIELD = 'customfield_10002'
+SPRINT_FIELD = 'customfield_10020'
+
+SPRINT = {
+    "id": 10, "boardId": 1, "name": "ABC Sprint 1", "state": "closed", "goal": "Ship it",
+    "startDate": "2021-03-01T09:00:00.000Z", "endDate": "2021-03-15T09:00:00.000Z", "completeDate": "2021-03-15T10:00:00.000Z"
+}
+NEXT_SPRINT = dict(SPRINT, id=11, name="ABC Sprint 2", state="active", completeDate=None,
+                   startDate="2021-03-15T09:00:00.000Z", endDate="2021-03-29T09:00:00.000Z")
+
+class FixtureJira:
+    """Stands in for `Jira` by serving a fixed set of issues from search, optionally failing after `fail_after` of them"""
+
+    def __init__(self, issues, fail_after=None):
+        self.issues = issues
+        self.fail_after = fail_after
+        self.searches = []
+
+    def searchIssues(self, jql, fields=None, expand=None, compact=True, strict=False):
+        self.searches.append(jql)
+        for index, issue in enumerate(self.issues):
+            if index == self.fail_after:
+                if strict:
+                    raise Error("Jira went away", f"Failed to fetch page of search starting at {index}")
+                return
+            yield issue
+
+def sprintMove(created, before, after):
+    return {"created": created, "items": [{"field": "Sprint", "fieldId": SPRINT_FIELD, "from": before, "to": after}]}
+
+def estimateChange(created, before, after):
+    return {"created": created, "items": [{"field": "Story Points", "fieldId": ESTIMATE_FIELD, "fromString": before, "toString": after}]}
+
+def issue(key, type_name, status, estimate, sprints, histories, created="2021-02-20T09:00:00.000Z", resolved=None):
+    return {
+        "key": key,
+        "fields": {
+            "issuetype": {"name": type_name},
+            "status": {"name": status, "statusCategory": {"key": "done" if status == "Done" else "indeterminate"}},
+            "created": created,
+            "updated": "2021-03-20T09:00:00.000Z",
+            "resolutiondate": resolved,
+            ESTIMATE_FIELD: estimate,
+            SPRINT_FIELD: sprints
+        },
+        "changelog": {"histories": histories}
+    }
+
+ISSUES = [
+    # Planned, re-estimated during the sprint and finished
+    issue("ABC-1", "Story", "Done", 5, [SPRINT], [
+        sprintMove("2021-02-28T09:00:00.000Z", "", "10"),
+        estimateChange("2021-03-05T09:00:00.000Z", "3", "5")
+    ], resolved="2021-03-10T09:00:00.000Z"),
+    # Pulled in part way through and finished
+    issue("ABC-2", "Bug", "Done", 2, [SPRINT], [
+        sprintMove("2021-03-05T09:00:00.000Z", "", "10")
+    ], resolved="2021-03-12T09:00:00.000Z"),
+    # Planned, then moved out to the next sprint
+    issue("ABC-3", "Story", "In Progress", 8, [NEXT_SPRINT], [
+        sprintMove("2021-02-28T09:00:00.000Z", "", "10"),
+        sprintMove("2021-03-08T09:00:00.000Z", "10", "11")
+    ]),
+    # Planned and not finished
+    issue("ABC-4", "Story", "In Progress", 8, [SPRINT], [
+        sprintMove("2021-02-28T09:00:00.000Z", "", "10")
+    ]),
+    # Taken out again before the sprint started, so never part of it
+    issue("ABC-5", "Story", "To Do", 1, [], [
+        sprintMove("2021-02-21T09:00:00.000Z", "", "10"),
+        sprintMove("2021-02-25T09:00:00.000Z", "10", "")
+    ]),
+    # Resolved only after the sprint closed
+    issue("ABC-6", "Story", "Done", 3, [SPRINT], [
+        sprintMove("2021-02-28T09:00:00.000Z", "", "10")
+    ], resolved="2021-03-16T09:00:00.000Z")
+]
+
+class IssueSyncTest(unittest.TestCase):
+
+    def sync(self, issues):
+        sync = IssueSync(FixtureJira(issues), ':memory:', ESTIMATE_FIELD, SPRINT_FIELD)
+        self.addCleanup(sync.close)
+        sync.sync('project = ABC')
+        return sync
+
+    @staticmethod
+    def estimates(issues, statistic):
+        return {issue["key"]: issue[statistic]["statFieldValue"].get("value") for issue in issues}
+
+    def test_rebuilds_sprint_report_from_changelog(self):
+        report = self.sync(ISSUES).buildSprintReport(10)
+        contents = report["contents"]
+
+        self.assertEqual(report["sprint"], {"id": 10, "name": "ABC Sprint 1", "state": "CLOSED", "goal": "Ship it"})
+        self.assertEqual([issue["key"] for issue in contents["completedIssues"]], ["ABC-1", "ABC-2"])
+        self.assertEqual([issue["key"] for issue in contents["issuesNotCompletedInCurrentSprint"]], ["ABC-4", "ABC-6"])
+        self.assertEqual([issue["key"] for issue in contents["puntedIssues"]], ["ABC-3"])
+        self.assertEqual(contents["issueKeysAddedDuringSprint"], {"ABC-2": True})
+
+        # Original estimates are as of the sprint starting (or the issue joining it), current ones as of it closing
+        self.assertEqual(self.estimates(contents["completedIssues"], "estimateStatistic"), {"ABC-1": 3, "ABC-2": 2})
+        self.assertEqual(self.estimates(contents["completedIssues"], "currentEstimateStatistic"), {"ABC-1": 5, "ABC-2": 2})
+        self.assertEqual(self.estimates(contents["puntedIssues"], "estimateStatistic"), {"ABC-3": 8})
+
+    def test_metrics_from_rebuilt_report(self):
+        metrics = Jira('localhost', 'user', 'token').calculateSprintMetrics(self.sync(ISSUES).buildSprintReport(10))
+
+        self.assertEqual(metrics["issue_keys"]["completed"], ["ABC-1", "ABC-2"])
+        self.assertEqual(metrics["issue_keys"]["removed"], ["ABC-3"])
+        self.assertEqual(metrics["items"]["unplanned_bugs_completed"], 1)
+        self.assertEqual(metrics["points"]["completed"], 7)
+
+    def test_large_sprint(self):
+        issues = [issue(f"ABC-{number}", "Story", "Done", 1, [SPRINT], [sprintMove("2021-02-28T09:00:00.000Z", "", "10")],
+                        resolved="2021-03-10T09:00:00.000Z") for number in range(1, 2001)]
+
+        sync = self.sync(issues)
+        if not hasattr(sqlite3.Connection, 'setlimit'):
+            self.skipTest("needs Python 3.11 to lower SQLite's variable limit")
+        # Older SQLite builds only allow 999 bound variables per statement
+        sync._IssueSync__db.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+
+        report = sync.buildSprintReport(10)
+
+        self.assertEqual(len(report["contents"]["completedIssues"]), 2000)
+
+    def test_failed_page_keeps_watermark(self):
+        issues = [issue(f"ABC-{number}", "Story", "Done", 1, [SPRINT], [sprintMove("2021-02-28T09:00:00.000Z", "", "10")],
+                        resolved="2021-03-10T09:00:00.000Z") for number in range(1, 251)]
+        jira = FixtureJira(issues, fail_after=100)
+        sync = IssueSync(jira, ':memory:', ESTIMATE_FIELD, SPRINT_FIELD)
+        self.addCleanup(sync.close)
+
+        with self.assertRaises(Error):
+            sync.sync('project = ABC')
+        self.assertIsNone(sync.lastSync('project = ABC'))
+
+        # Jira is back, the next sync starts over rather than only asking for recently updated issues
+        jira.fail_after = None
+        self.assertEqual(sync.sync('project = ABC')["issues"], 250)
+        self.assertNotIn("updated >=", jira.searches[-1])
+        self.assertIsNotNone(sync.lastSync('project = ABC'))
+        self.assertEqual(len(sync.buildSprintReport(10)["contents"]["completedIssues"]), 250)
+
+    def test_pages_over_a_stable_order(self):
+        jira = FixtureJira(ISSUES)
+        sync = IssueSync(jira, ':memory:', ESTIMATE_FIELD, SPRINT_FIELD)
+        self.addCleanup(sync.close)
+        sync.sync('project = ABC')
+        sync.sync('project = ABC')
+
+        # Ordered by `updated`, issues edited while we page would shift the ones after them past a page boundary
+        for jql in jira.searches:
+            self.assertTrue(jql.endswith("ORDER BY created ASC, key ASC"), jql)
+        self.assertIn("updated >=", jira.searches[-1])
+
+    def test_unknown_sprint(self):
+        self.assertIsNone(self.sync(ISSUES).buildSprintReport(99))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from custom_jira import Error, Jira
+
+PAGE_SIZE = 50
+
+class StubPages:
+    """Stands in for Jira's sprint listing, serving `total` sprints oldest first a page at a time"""
+
+    def __init__(self, total, failing=()):
+        self.sprints = [{"id": number, "name": f"ABC Sprint {number}"} for number in range(1, total + 1)]
+        self.failing = set(failing)
+        self.requested = []
+
+    def __call__(self, link, start_at, params=None):
+        self.requested.append(start_at)
+        if start_at in self.failing:
+            return False
+
+        values = self.sprints[start_at:start_at + PAGE_SIZE]
+        return {"startAt": start_at, "maxResults": PAGE_SIZE, "isLast": start_at + PAGE_SIZE >= len(self.sprints), "values": values}
+
+class NewestSprintsTest(unittest.TestCase):
+
+    def jira(self, pages):
+        jira = Jira('localhost', 'user', 'token')
+        jira._Jira__getPage = pages
+        return jira
+
+    def test_matches_full_listing(self):
+        for total in (1, 49, 50, 51, 100, 123, 200, 201, 1000):
+            expected = list(reversed(StubPages(total).sprints))
+            for count in (1, 3, 50, 51, 120, 200, 2000):
+                with self.subTest(total=total, count=count):
+                    self.assertEqual(self.jira(StubPages(total)).getNewestSprintsInBoard(1, count), expected[:count])
+
+    def test_empty_board(self):
+        self.assertEqual(self.jira(StubPages(0)).getNewestSprintsInBoard(1, 3), [])
+
+    def test_asks_for_few_pages(self):
+        pages = StubPages(1000)
+        self.jira(pages).getNewestSprintsInBoard(1, 3)
+
+        # Galloping past and searching back for the last of 20 pages is logarithmic, not a walk through them all
+        self.assertLessEqual(len(pages.requested), 12)
+        self.assertEqual(len(pages.requested), len(set(pages.requested)))
+
+    def test_failed_probe_during_gallop(self):
+        # The probe at 100 fails on a board that goes on to 123, it mustn't be mistaken for the end of the board
+        pages = StubPages(123, failing={100})
+
+        with self.assertRaises(Error):
+            self.jira(pages).getNewestSprintsInBoard(1, 3)
+        self.assertIn(100, pages.requested)
+
+    def test_failed_page_walking_back(self):
+        with self.assertRaises(Error):
+            self.jira(StubPages(123, failing={50})).getNewestSprintsInBoard(1, 80)
+
+    def test_failed_first_page(self):
+        with self.assertRaises(Error):
+            self.jira(StubPages(123, failing={0})).getNewestSprintsInBoard(1, 3)
+
+if __name__ == '__main__':
+    unittest.main()